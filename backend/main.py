@@ -1,29 +1,219 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import pandas as pd
 import os
-import json
+import orjson
 import asyncio
 from datetime import datetime
 from typing import List, Dict, Any
+import httpx
 import openai
 from dotenv import load_dotenv
 import uuid
 import re
+import sqlite3
 import time
+import logging
+from collections import Counter, OrderedDict
+from hashlib import blake2b
+
+# Configure logging once; LOG_LEVEL=DEBUG restores the per-comment chatter
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(message)s")
+logger = logging.getLogger(__name__)
 from model_config import get_analysis_config, get_available_analysis_modes, AnalysisMode
 
 # Load environment variables
 load_dotenv("config.env")
 
+# Long-lived HTTP/2 client: the analysis phase fires dozens of concurrent
+# requests, and multiplexing them over a few pooled TLS connections avoids
+# per-request handshakes and HTTP/1.1 head-of-line blocking
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    timeout=30.0,
+)
+
 # Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+# How many comment analyses may be in flight at once; the work is
+# network-bound, so concurrency cuts wall-clock roughly linearly
+ANALYSIS_CONCURRENCY = 32
+
+# How many comments share one OpenAI prompt; amortizes the HTTP/TLS and
+# per-request model overhead across the whole slice
+PROMPT_BATCH_SIZE = 20
+
+# Cap on the estimated comment tokens packed into one prompt, so a run of
+# long comments can't push a batch past the model's context window
+PROMPT_TOKEN_BUDGET = 3000
+
+try:
+    import tiktoken
+    _TOKEN_ENCODER = tiktoken.encoding_for_model("gpt-4o-mini")
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    _TOKEN_ENCODER = None
+    TIKTOKEN_AVAILABLE = False
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a comment text
+
+    Uses the real tokenizer when tiktoken is installed; otherwise the usual
+    ~4-characters-per-token heuristic, which is plenty for a safety cap.
+    """
+    if TIKTOKEN_AVAILABLE:
+        return len(_TOKEN_ENCODER.encode(text))
+    return max(1, len(text) // 4)
+
+class RateLimiter:
+    """Token bucket over both request and token budgets
+
+    Refills lazily from elapsed time on each acquire, so there's no
+    background task to manage; awaiting callers sleep just long enough for
+    the bucket to cover them. This saturates the account's actual RPM/TPM
+    ceiling instead of an arbitrary fixed delay.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self.last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.request_capacity = min(
+            float(self.requests_per_minute),
+            self.request_capacity + elapsed * self.requests_per_minute / 60.0,
+        )
+        self.token_capacity = min(
+            float(self.tokens_per_minute),
+            self.token_capacity + elapsed * self.tokens_per_minute / 60.0,
+        )
+
+    async def acquire(self, tokens: int):
+        """Block until one request plus `tokens` tokens fit in the budget"""
+        # A request above the bucket's full capacity could never be satisfied
+        # and would sleep forever; clamp it so an over-budget prompt (a single
+        # oversized text in its own batch) just drains the whole minute
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            async with self._lock:
+                self._refill()
+                if self.request_capacity >= 1.0 and self.token_capacity >= tokens:
+                    self.request_capacity -= 1.0
+                    self.token_capacity -= tokens
+                    return
+                wait_requests = (1.0 - self.request_capacity) * 60.0 / self.requests_per_minute
+                wait_tokens = (tokens - self.token_capacity) * 60.0 / self.tokens_per_minute
+            await asyncio.sleep(max(wait_requests, wait_tokens, 0.01))
+
+# Defaults match OpenAI tier-1 gpt-4o-mini limits; override per deployment
+rate_limiter = RateLimiter(
+    int(os.getenv("OPENAI_RPM", "500")),
+    int(os.getenv("OPENAI_TPM", "200000")),
+)
+
+async def create_chat_completion(estimated_tokens: int, **kwargs):
+    """Rate-limited chat.completions.create with backoff on 429s"""
+    backoff = 1.0
+    for attempt in range(4):
+        await rate_limiter.acquire(estimated_tokens)
+        try:
+            return await client.chat.completions.create(**kwargs)
+        except openai.RateLimitError:
+            if attempt == 3:
+                raise
+            log_analysis_step("⏳ RATE LIMITED", f"Backing off {backoff:.0f}s before retry")
+            await asyncio.sleep(backoff)
+            backoff *= 2
+
+def pack_prompt_batches(texts: List[str]) -> List[List[str]]:
+    """Pack texts into prompt batches capped by count and token budget"""
+    batches = []
+    current = []
+    current_tokens = 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= PROMPT_BATCH_SIZE or current_tokens + tokens > PROMPT_TOKEN_BUDGET):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+# Memoized analyses keyed by normalized-text digest; comment CSVs repeat
+# the same short texts constantly and each repeat would otherwise pay a
+# full API round-trip
+analysis_cache = OrderedDict()
+ANALYSIS_CACHE_MAX = 100_000
+
+def analysis_cache_key(text: str) -> bytes:
+    """Cache key for a comment text, ignoring case and surrounding whitespace"""
+    return blake2b(text.strip().lower().encode("utf-8", "ignore"), digest_size=16).digest()
+
+# Disk tier behind the in-memory LRU: analyses persist across restarts, so
+# re-uploading the same CSV costs zero API calls for already-seen texts
+CACHE_DIR = "cache"
+
+def _open_cache_db() -> sqlite3.Connection:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(
+        os.path.join(CACHE_DIR, "analysis_cache.db"),
+        isolation_level=None,  # Autocommit; one small row per store
+        check_same_thread=False,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS analyses (key BLOB PRIMARY KEY, result BLOB)")
+    return conn
+
+cache_db = _open_cache_db()
+
+def cache_lookup(key: bytes) -> Any:
+    """Look an analysis up in the memory tier, then the disk tier"""
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        analysis_cache.move_to_end(key)
+        return cached
+
+    row = cache_db.execute("SELECT result FROM analyses WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+
+    cached = orjson.loads(row[0])
+    analysis_cache[key] = cached  # Promote so repeats stay in memory
+    if len(analysis_cache) > ANALYSIS_CACHE_MAX:
+        analysis_cache.popitem(last=False)
+    return cached
+
+def cache_store(key: bytes, analysis: Dict[str, Any]):
+    """Store an analysis in both cache tiers"""
+    analysis_cache[key] = dict(analysis)
+    if len(analysis_cache) > ANALYSIS_CACHE_MAX:
+        analysis_cache.popitem(last=False)
+    cache_db.execute(
+        "INSERT OR REPLACE INTO analyses VALUES (?, ?)",
+        (key, orjson.dumps(analysis)),
+    )
 
 # Initialize FastAPI app
 app = FastAPI(
     title="L'Oréal Comment Analysis API (OpenAI)",
     description="AI-powered analysis using OpenAI models only",
-    version="2.0.0"
+    version="2.0.0",
+    # orjson serializes the large search/status payloads ~3x faster than
+    # stdlib json and handles NumPy scalars natively
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -35,35 +225,240 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for demo
-comments_data = []
+# Columns that serialize back out as each comment's nested "analysis" dict
+ANALYSIS_COLUMNS = ["sentiment", "category", "quality_score", "is_spam", "confidence", "processing_time"]
+BASE_COLUMNS = ["comment_id", "text_original", "text_lower", "video_id", "author_id", "like_count", "published_at"]
+# text_lower is a search-only derivative of text_original; keep it out of
+# serialized responses so payloads don't carry every comment's text twice
+RECORD_COLUMNS = [column for column in BASE_COLUMNS if column != "text_lower"]
+
+# In-memory storage for demo; columnar (one NumPy-backed column per field)
+# rather than a list of per-row dicts, which cost ~500 bytes of dict/str
+# overhead per comment and forced Python-level scans for every aggregation
+comments_df = pd.DataFrame(columns=BASE_COLUMNS + ANALYSIS_COLUMNS)
 analysis_results = {}
 current_analysis_id = None
-cancelled_analyses = set()  # Track cancelled analyses
+analysis_tasks = {}  # analysis_id -> running asyncio.Task, for cancellation
+
+# Bumped whenever comments_df changes (upload or analysis wave) so the
+# dashboard can serve a cached aggregation until the data actually moves
+data_version = 0
+_stats_cache = {"version": -1, "payload": None}
+
+# Computed once per upload; video identity never changes afterwards, so
+# read endpoints shouldn't re-hash the whole column to count them
+total_videos = 0
+
+# Online aggregates maintained by the analysis loop: O(1) work per result
+# and an O(1) stats endpoint, instead of rescanning every analyzed row
+QUALITY_BIN_LABELS = ["0-0.2", "0.2-0.4", "0.4-0.6", "0.6-0.8", "0.8-1.0"]
+
+def _empty_running_stats() -> Dict[str, Any]:
+    return {
+        "sentiment": Counter(),
+        "category": Counter(),
+        "quality_sum": 0.0,
+        "quality_hist": [0] * len(QUALITY_BIN_LABELS),
+        "spam": 0,
+        "analyzed": 0,
+    }
+
+running_stats = _empty_running_stats()
+
+def update_running_stats(analyses: List[Dict[str, Any]]):
+    """Fold one wave of analyses into the online dashboard aggregates"""
+    for analysis in analyses:
+        running_stats["sentiment"][analysis.get("sentiment", "neutral")] += 1
+        running_stats["category"][analysis.get("category", "general")] += 1
+        quality = float(analysis.get("quality_score", 0.5))
+        running_stats["quality_sum"] += quality
+        running_stats["quality_hist"][min(int(quality * 5), len(QUALITY_BIN_LABELS) - 1)] += 1
+        if analysis.get("is_spam", False):
+            running_stats["spam"] += 1
+        running_stats["analyzed"] += 1
+
+# Per-analysis results are streamed to SQLite so long jobs keep O(1) RAM
+# beyond the comment store itself and survive a process restart
+RUNS_DIR = "runs"
+
+def open_run_db(analysis_id: str) -> sqlite3.Connection:
+    """Open (creating if needed) the on-disk result store for one analysis"""
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(RUNS_DIR, f"{analysis_id}.db"))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS results (
+            row_idx INTEGER PRIMARY KEY,
+            sentiment TEXT,
+            category TEXT,
+            quality_score REAL,
+            is_spam INTEGER,
+            confidence REAL,
+            processing_time REAL
+        )"""
+    )
+    return conn
+
+def persist_analysis_rows(conn: sqlite3.Connection, start_row: int, analyses: List[Dict[str, Any]]):
+    """Append one completed wave of analyses to the run database"""
+    conn.executemany(
+        "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                start_row + offset,
+                analysis["sentiment"],
+                analysis["category"],
+                float(analysis["quality_score"]),
+                int(bool(analysis["is_spam"])),
+                float(analysis["confidence"]),
+                float(analysis.get("processing_time", 0.0)),
+            )
+            for offset, analysis in enumerate(analyses)
+        ],
+    )
+    conn.commit()
+
+def comment_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Serialize DataFrame rows to the API's comment-dict shape
+
+    The columnar store only materializes Python dicts here, at response
+    time; unanalyzed rows get analysis=None like the old list-of-dicts.
+    """
+    records = df[RECORD_COLUMNS].to_dict(orient="records")
+    analyses = df[ANALYSIS_COLUMNS].to_dict(orient="records")
+    analyzed = df["sentiment"].notna().tolist()
+    for record, analysis, has_analysis in zip(records, analyses, analyzed):
+        record["analysis"] = analysis if has_analysis else None
+    return records
+
+# Inverted indexes for search, rebuilt on upload and analysis completion so
+# queries intersect small sets instead of scanning every comment
+search_index = {
+    "tokens": {},       # token -> set of comment indices
+    "sentiment": {},    # sentiment -> set of analyzed comment indices
+    "category": {},     # category -> set of analyzed comment indices
+    "spam": set(),
+    "not_spam": set(),
+    "unanalyzed": set(),
+    "built": False
+}
+
+def rebuild_search_index():
+    """Rebuild the inverted indexes over comments_df"""
+    tokens = {}
+    by_sentiment = {}
+    by_category = {}
+    spam = set()
+    not_spam = set()
+    unanalyzed = set()
+
+    # Pull each column out once; iterating plain lists avoids per-cell
+    # pandas indexing in the loop
+    text_lowers = comments_df["text_lower"].tolist()
+    sentiments = comments_df["sentiment"].tolist()
+    categories = comments_df["category"].tolist()
+    spam_flags = comments_df["is_spam"].tolist()
+
+    for idx, text_lower in enumerate(text_lowers):
+        for token in set(text_lower.split()):
+            tokens.setdefault(token, set()).add(idx)
+
+        sentiment = sentiments[idx]
+        if pd.notna(sentiment):
+            by_sentiment.setdefault(sentiment, set()).add(idx)
+            by_category.setdefault(categories[idx], set()).add(idx)
+            if spam_flags[idx]:
+                spam.add(idx)
+            else:
+                not_spam.add(idx)
+        else:
+            unanalyzed.add(idx)
+
+    search_index.update({
+        "tokens": tokens,
+        "sentiment": by_sentiment,
+        "category": by_category,
+        "spam": spam,
+        "not_spam": not_spam,
+        "unanalyzed": unanalyzed,
+        "built": True
+    })
+    log_analysis_step("🔎 SEARCH INDEX BUILT", f"Comments: {len(comments_df)}, Tokens: {len(tokens)}")
+
+def update_analysis_index(start_row: int, analyses: List[Dict[str, Any]]):
+    """Fold one wave of fresh analyses into the filter buckets
+
+    The token postings don't change when a comment gains an analysis, so
+    waves only move rows out of the unanalyzed set and into their
+    sentiment/category/spam buckets — no O(N) rebuild mid-run.
+    """
+    if not search_index["built"]:
+        return
+
+    for offset, analysis in enumerate(analyses):
+        idx = start_row + offset
+        search_index["unanalyzed"].discard(idx)
+        search_index["sentiment"].setdefault(analysis.get("sentiment", "neutral"), set()).add(idx)
+        search_index["category"].setdefault(analysis.get("category", "general"), set()).add(idx)
+        if analysis.get("is_spam", False):
+            search_index["spam"].add(idx)
+        else:
+            search_index["not_spam"].add(idx)
+
+def reset_analysis_aggregates():
+    """Zero the per-result aggregates before a fresh (non-resume) run
+
+    update_running_stats and update_analysis_index fold every wave in
+    unconditionally, so re-analyzing the same corpus would double-count the
+    online stats and leave rows in stale filter buckets. Token postings
+    depend only on the text and are left alone.
+    """
+    global running_stats
+    running_stats = _empty_running_stats()
+    if search_index["built"]:
+        search_index["sentiment"] = {}
+        search_index["category"] = {}
+        search_index["spam"] = set()
+        search_index["not_spam"] = set()
+        search_index["unanalyzed"] = set(range(len(comments_df)))
 
 # Analysis configuration
 current_analysis_mode = "balanced"  # Default mode
 analysis_config = get_analysis_config(current_analysis_mode)
 
-def log_analysis_step(step: str, details: str = "", comment_id: str = "", analysis_id: str = ""):
-    """Enhanced logging function for analysis steps"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    prefix = f"[{timestamp}]"
-    
+def log_analysis_step(step: str, details: str = "", comment_id: str = "", analysis_id: str = "", level: int = logging.INFO):
+    """Enhanced logging function for analysis steps
+
+    Formatting only happens when the level is enabled, so per-comment DEBUG
+    lines cost a single check on the hot path; logging's asctime replaces the
+    per-call datetime.now().strftime.
+    """
+    if not logger.isEnabledFor(level):
+        return
+
+    prefix = ""
     if analysis_id:
-        prefix += f" [Analysis-{analysis_id[:8]}]"
+        prefix += f"[Analysis-{analysis_id[:8]}] "
     if comment_id:
-        prefix += f" [Comment-{comment_id[:8]}]"
-    
-    print(f"{prefix} {step}")
+        prefix += f"[Comment-{comment_id[:8]}] "
+
     if details:
-        print(f"{' ' * (len(prefix) + 1)} └─ {details}")
+        logger.log(level, "%s%s └─ %s", prefix, step, details)
+    else:
+        logger.log(level, "%s%s", prefix, step)
 
 async def analyze_comment_with_ai(comment_text: str, comment_id: str = "", analysis_id: str = "") -> Dict[str, Any]:
     """Analyze a single comment using OpenAI models with detailed logging"""
-    log_analysis_step("🔍 STARTING COMMENT ANALYSIS", f"Text: '{comment_text[:50]}{'...' if len(comment_text) > 50 else ''}'", comment_id, analysis_id)
-    log_analysis_step("🤖 USING OPENAI", f"Mode: {current_analysis_mode}, Config: {analysis_config.mode.value}", comment_id, analysis_id)
-    
+    log_analysis_step("🔍 STARTING COMMENT ANALYSIS", f"Text: '{comment_text[:50]}{'...' if len(comment_text) > 50 else ''}'", comment_id, analysis_id, level=logging.DEBUG)
+
+    cache_key = analysis_cache_key(comment_text)
+    cached = cache_lookup(cache_key)
+    if cached is not None:
+        log_analysis_step("⚡ CACHE HIT", "Reusing analysis for identical text", comment_id, analysis_id, level=logging.DEBUG)
+        return dict(cached)
+
+    log_analysis_step("🤖 USING OPENAI", f"Mode: {current_analysis_mode}, Config: {analysis_config.mode.value}", comment_id, analysis_id, level=logging.DEBUG)
+
     try:
         start_time = time.time()
         
@@ -72,7 +467,7 @@ async def analyze_comment_with_ai(comment_text: str, comment_id: str = "", analy
         
         processing_time = time.time() - start_time
         
-        log_analysis_step("📥 RECEIVED OPENAI RESPONSE", f"Processing time: {processing_time:.2f}s, Result: {result}", comment_id, analysis_id)
+        log_analysis_step("📥 RECEIVED OPENAI RESPONSE", f"Processing time: {processing_time:.2f}s, Result: {result}", comment_id, analysis_id, level=logging.DEBUG)
         
         # Format result to match expected structure
         analysis_result = {
@@ -84,8 +479,11 @@ async def analyze_comment_with_ai(comment_text: str, comment_id: str = "", analy
             "processing_time": processing_time
         }
         
-        log_analysis_step("🎯 ANALYSIS COMPLETE", f"Sentiment: {analysis_result['sentiment']}, Category: {analysis_result['category']}, Quality: {analysis_result['quality_score']:.2f}, Spam: {analysis_result['is_spam']}", comment_id, analysis_id)
-        
+        log_analysis_step("🎯 ANALYSIS COMPLETE", f"Sentiment: {analysis_result['sentiment']}, Category: {analysis_result['category']}, Quality: {analysis_result['quality_score']:.2f}, Spam: {analysis_result['is_spam']}", comment_id, analysis_id, level=logging.DEBUG)
+
+        # Cache successful analyses only; fallbacks shouldn't stick
+        cache_store(cache_key, analysis_result)
+
         return analysis_result
         
     except Exception as e:
@@ -114,7 +512,7 @@ async def analyze_with_openai(comment_text: str) -> Dict[str, Any]:
         
         Comment: "{comment_text}"
         
-        Please analyze and return ONLY a valid JSON object with these exact fields:
+        Return a JSON object with these exact fields:
         {{
             "sentiment": "positive", "negative", or "neutral",
             "category": "skincare", "makeup", "fragrance", "haircare", or "general",
@@ -129,30 +527,22 @@ async def analyze_with_openai(comment_text: str) -> Dict[str, Any]:
         - Quality: Rate based on comment length, detail, and helpfulness
         - Spam: Detect promotional, irrelevant, or low-quality content
         - Confidence: Rate your confidence in the analysis (0.0-1.0)
-        
-        Return ONLY the JSON object, no other text.
         """
-        
-        response = client.chat.completions.create(
+
+        response = await create_chat_completion(
+            estimate_tokens(prompt) + 120,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are an expert beauty industry analyst. Always respond with valid JSON only."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=200,
-            temperature=0.3
+            max_tokens=120,  # JSON mode emits the bare five-field object, no prose
+            temperature=0.3,
+            response_format={"type": "json_object"}
         )
-        
-        # Parse the JSON response
-        result_text = response.choices[0].message.content.strip()
-        
-        # Clean up the response to ensure it's valid JSON
-        if result_text.startswith("```json"):
-            result_text = result_text[7:]
-        if result_text.endswith("```"):
-            result_text = result_text[:-3]
-        
-        result = json.loads(result_text)
+
+        # JSON mode guarantees a parseable object, so no cleanup pass is needed
+        result = orjson.loads(response.choices[0].message.content)
         
         # Validate and clean the result
         return {
@@ -164,7 +554,7 @@ async def analyze_with_openai(comment_text: str) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        print(f"OpenAI analysis error: {e}")
+        logger.error(f"OpenAI analysis error: {e}")
         # Return fallback result
         return {
             "sentiment": "neutral",
@@ -174,37 +564,173 @@ async def analyze_with_openai(comment_text: str) -> Dict[str, Any]:
             "confidence": 0.3
         }
 
-def process_csv_file(file_path: str) -> List[Dict[str, Any]]:
-    """Process CSV file and return structured data"""
+async def analyze_batch_with_openai(texts: List[str]) -> List[Dict[str, Any]]:
+    """Analyze several comments with a single OpenAI request
+
+    Returns one result dict per input text, in order. Raises if the model
+    response cannot be aligned with the inputs so the caller can fall back
+    to per-comment analysis.
+    """
+    numbered = "\n".join(f'{i}: "{text}"' for i, text in enumerate(texts))
+    prompt = f"""
+    Analyze each of these beauty/skincare comments and return a JSON object with a
+    single key "results": an array with exactly one object per comment, in the same
+    order as listed:
+
+    {numbered}
+
+    Each object in "results" must have these exact fields:
+    {{
+        "sentiment": "positive", "negative", or "neutral",
+        "category": "skincare", "makeup", "fragrance", "haircare", or "general",
+        "quality_score": 0.0 to 1.0 (higher = better quality),
+        "is_spam": true or false,
+        "confidence": 0.0 to 1.0 (confidence in the analysis)
+    }}
+    """
+
+    response = await create_chat_completion(
+        estimate_tokens(prompt) + 120 * len(texts),
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You are an expert beauty industry analyst. Always respond with valid JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=120 * len(texts),
+        temperature=0.3,
+        response_format={"type": "json_object"}
+    )
+
+    parsed = orjson.loads(response.choices[0].message.content).get("results")
+    if not isinstance(parsed, list) or len(parsed) != len(texts):
+        raise ValueError(f"Expected {len(texts)} results, got {parsed if not isinstance(parsed, list) else len(parsed)}")
+
+    return [{
+        "sentiment": entry.get("sentiment", "neutral").lower(),
+        "category": entry.get("category", "general").lower(),
+        "quality_score": float(entry.get("quality_score", 0.5)),
+        "is_spam": bool(entry.get("is_spam", False)),
+        "confidence": float(entry.get("confidence", 0.7))
+    } for entry in parsed]
+
+async def analyze_comments_batch(texts: List[str], analysis_id: str = "") -> List[Dict[str, Any]]:
+    """Analyze a group of comment texts, packing uncached ones into one prompt"""
+    keys = [analysis_cache_key(text) for text in texts]
+    analyses: List[Any] = [cache_lookup(key) for key in keys]
+    pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+
+    if pending:
+        try:
+            start_time = time.time()
+            batch_results = await analyze_batch_with_openai([texts[i] for i in pending])
+            processing_time = (time.time() - start_time) / len(pending)
+
+            for i, result in zip(pending, batch_results):
+                analysis = {**result, "processing_time": processing_time}
+                analyses[i] = analysis
+                cache_store(keys[i], analysis)
+
+            log_analysis_step("📦 BATCH ANALYSIS COMPLETE", f"{len(pending)} comments in one request", analysis_id=analysis_id)
+        except Exception as e:
+            log_analysis_step("⚠️ BATCH ANALYSIS FALLBACK", f"Per-comment retry after: {e}", analysis_id=analysis_id)
+            for i in pending:
+                analyses[i] = await analyze_comment_with_ai(texts[i], analysis_id=analysis_id)
+
+    return [dict(analysis) for analysis in analyses]
+
+# The only CSV columns the backend ever reads, with their parse dtypes;
+# declaring them up front lets the parser skip type inference and the
+# nullable-integer slow path
+CSV_DTYPES = {
+    "commentId": str,
+    "textOriginal": str,
+    "videoId": str,
+    "authorId": str,
+    "likeCount": "float64",  # Floats tolerate missing values; cast to int after fillna
+    "publishedAt": str,
+}
+CSV_COLUMNS = list(CSV_DTYPES)
+
+def read_comments_csv(file_path: str) -> pd.DataFrame:
+    """Read an uploaded CSV, parsing only the needed columns
+
+    Streams the file through pyarrow's incremental CSV reader in 8MB blocks
+    so parse memory stays bounded regardless of file size, and falls back to
+    the default pandas parser when pyarrow isn't installed.
+    """
+    header = pd.read_csv(file_path, nrows=0)
+    usecols = [column for column in CSV_COLUMNS if column in header.columns]
+    if not usecols:
+        return header
+
+    dtypes = {column: CSV_DTYPES[column] for column in usecols}
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        reader = pacsv.open_csv(
+            file_path,
+            read_options=pacsv.ReadOptions(block_size=8 << 20),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=usecols,
+                column_types={
+                    column: pa.string() if CSV_DTYPES[column] is str else pa.float64()
+                    for column in usecols
+                },
+            ),
+        )
+        batches = list(reader)
+        if not batches:
+            return header[usecols]
+        return pa.Table.from_batches(batches).to_pandas()
+    except (ImportError, ValueError) as e:
+        log_analysis_step("⚠️ PYARROW UNAVAILABLE", f"Using default CSV engine: {e}")
+        return pd.read_csv(file_path, usecols=usecols, dtype=dtypes)
+
+def process_csv_file(file_path: str) -> pd.DataFrame:
+    """Process CSV file into the columnar comment store"""
     log_analysis_step("📁 PROCESSING CSV FILE", f"File: {file_path}")
-    
+
     try:
-        df = pd.read_csv(file_path)
+        df = read_comments_csv(file_path)
         log_analysis_step("📊 CSV LOADED", f"Rows: {len(df)}, Columns: {list(df.columns)}")
-        
-        processed_comments = []
-        
-        for index, row in df.iterrows():
-            comment = {
-                "comment_id": str(row.get('commentId', f'comment_{index}')),
-                "text_original": str(row.get('textOriginal', '')),
-                "video_id": str(row.get('videoId', '')),
-                "author_id": str(row.get('authorId', '')),
-                "like_count": int(row.get('likeCount', 0)) if pd.notna(row.get('likeCount')) else 0,
-                "published_at": str(row.get('publishedAt', '')),
-                "analysis": None  # Will be filled during analysis
-            }
-            processed_comments.append(comment)
-            
-            if (index + 1) % 100 == 0:  # Log every 100 comments
-                log_analysis_step("📝 PROCESSING PROGRESS", f"Processed {index + 1}/{len(df)} comments")
-        
-        log_analysis_step("✅ CSV PROCESSING COMPLETE", f"Total comments processed: {len(processed_comments)}")
-        return processed_comments
-        
+
+        def column_as_str(name: str) -> pd.Series:
+            if name in df.columns:
+                return df[name].astype(str)
+            return pd.Series("", index=df.index)
+
+        # Vectorized column normalization; iterrows built a Python object per
+        # cell and dominated upload time on large files
+        out = pd.DataFrame(index=df.index)
+        if 'commentId' in df.columns:
+            out["comment_id"] = df['commentId'].astype(str)
+        else:
+            out["comment_id"] = [f'comment_{index}' for index in df.index]
+        out["text_original"] = column_as_str('textOriginal')
+        out["text_lower"] = out["text_original"].str.lower()  # Precomputed once for search
+        out["video_id"] = column_as_str('videoId')
+        out["author_id"] = column_as_str('authorId')
+        if 'likeCount' in df.columns:
+            out["like_count"] = pd.to_numeric(df['likeCount'], errors='coerce').fillna(0).astype(int)
+        else:
+            out["like_count"] = 0
+        out["published_at"] = column_as_str('publishedAt')
+        for column in ANALYSIS_COLUMNS:
+            out[column] = pd.NA  # Filled in place during analysis
+
+        out.reset_index(drop=True, inplace=True)
+        log_analysis_step("✅ CSV PROCESSING COMPLETE", f"Total comments processed: {len(out)}")
+        return out
+
     except Exception as e:
         log_analysis_step("❌ CSV PROCESSING ERROR", f"Error: {e}")
-        return []
+        return pd.DataFrame(columns=BASE_COLUMNS + ANALYSIS_COLUMNS)
+
+@app.on_event("shutdown")
+async def close_http_client():
+    """Drain the pooled OpenAI connections on shutdown"""
+    await http_client.aclose()
 
 # API Routes
 @app.get("/")
@@ -253,8 +779,8 @@ async def set_analysis_mode(request: dict):
 @app.post("/api/comments/upload")
 async def upload_comments(file: UploadFile = File(...)):
     """Upload and process CSV file"""
-    global comments_data
-    
+    global comments_df, data_version, total_videos, running_stats
+
     log_analysis_step("🚀 FILE UPLOAD STARTED", f"Filename: {file.filename}, Size: {file.size} bytes")
     
     try:
@@ -262,19 +788,26 @@ async def upload_comments(file: UploadFile = File(...)):
         file_path = f"uploads/{file.filename}"
         os.makedirs("uploads", exist_ok=True)
         
+        # Stream to disk in 1MB chunks; reading the whole CSV first held
+        # the entire file in RAM on top of Starlette's spooled copy
         with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
+            while chunk := await file.read(1 << 20):
+                buffer.write(chunk)
+
         log_analysis_step("💾 FILE SAVED", f"Saved to: {file_path}")
         
-        # Process CSV
-        comments_data = process_csv_file(file_path)
-        
+        # Parse and index off the event loop; pd.read_csv on a large file
+        # would otherwise stall every other request for seconds
+        comments_df = await asyncio.to_thread(process_csv_file, file_path)
+        total_videos = int(comments_df["video_id"].nunique()) if len(comments_df) else 0
+        running_stats = _empty_running_stats()  # Fresh corpus, fresh aggregates
+        data_version += 1
+        await asyncio.to_thread(rebuild_search_index)
+
         result = {
-            "videos_processed": len(set(c["video_id"] for c in comments_data)),
-            "comments_processed": len(comments_data),
-            "total_rows": len(comments_data),
+            "videos_processed": total_videos,
+            "comments_processed": len(comments_df),
+            "total_rows": len(comments_df),
             "message": "File uploaded and processed successfully"
         }
         
@@ -291,7 +824,7 @@ async def start_analysis(request: dict):
     """Start AI analysis of uploaded comments"""
     global current_analysis_id, analysis_results
     
-    if not comments_data:
+    if comments_df.empty:
         log_analysis_step("❌ ANALYSIS START FAILED", "No comments to analyze. Please upload a file first.")
         raise HTTPException(status_code=400, detail="No comments to analyze. Please upload a file first.")
     
@@ -306,152 +839,251 @@ async def start_analysis(request: dict):
             current_analysis_id = resume_analysis_id
             
             # Start analysis from where it left off
-            asyncio.create_task(run_ai_analysis(resume_analysis_id, resume=True))
-            
+            analysis_tasks[resume_analysis_id] = asyncio.create_task(
+                run_ai_analysis(resume_analysis_id, resume=True)
+            )
+
             return {"analysis_id": resume_analysis_id, "status": "resumed"}
     
     # Start new analysis
     analysis_id = str(uuid.uuid4())
     current_analysis_id = analysis_id
     
-    log_analysis_step("🎯 ANALYSIS STARTED", f"Analysis ID: {analysis_id}, Total comments: {len(comments_data)}")
-    
+    log_analysis_step("🎯 ANALYSIS STARTED", f"Analysis ID: {analysis_id}, Total comments: {len(comments_df)}")
+
     analysis_results[analysis_id] = {
         "analysis_id": analysis_id,
         "status": "processing",
         "progress": 0,
-        "total_comments": len(comments_data),
-        "processed_comments": 0,
-        "results": []
+        "total_comments": len(comments_df),
+        "processed_comments": 0
     }
     
-    # Start analysis in background
-    asyncio.create_task(run_ai_analysis(analysis_id))
-    
+    # Start analysis in background, keeping the task handle for cancellation
+    analysis_tasks[analysis_id] = asyncio.create_task(run_ai_analysis(analysis_id))
+
     return {"analysis_id": analysis_id, "status": "started"}
 
 async def run_ai_analysis(analysis_id: str, resume: bool = False):
     """Run AI analysis on comments with detailed logging"""
-    global analysis_results, comments_data, cancelled_analyses
-    
+    global analysis_results, comments_df, data_version
+
     log_analysis_step("🔄 BACKGROUND ANALYSIS STARTED", f"Analysis ID: {analysis_id}, Resume: {resume}", analysis_id=analysis_id)
-    
+
+    run_db = None
     try:
-        # Get existing results if resuming
+        # Resume from the processed-row counter; the analyses themselves
+        # live in comments_df's analysis columns, not a separate list
         if resume and analysis_id in analysis_results:
-            results = analysis_results[analysis_id].get("results", [])
-            start_index = len(results)
+            start_index = analysis_results[analysis_id].get("processed_comments", 0)
             log_analysis_step("🔄 RESUMING FROM", f"Starting from comment {start_index + 1}", analysis_id=analysis_id)
         else:
-            results = []
             start_index = 0
-        
-        total = len(comments_data)
+            reset_analysis_aggregates()
+
+        total = len(comments_df)
         start_time = time.time()
-        
-        log_analysis_step("⚙️ ANALYSIS PARAMETERS", f"Total comments: {total}, Start index: {start_index}, Model: gpt-4o-mini, Delay: 0.2s", analysis_id=analysis_id)
-        
-        for i in range(start_index, total):
-            # Check if analysis was cancelled BEFORE processing each comment
-            if analysis_id in cancelled_analyses:
-                log_analysis_step("🛑 ANALYSIS CANCELLED", f"Stopped at comment {i+1}/{total}", analysis_id=analysis_id)
-                analysis_results[analysis_id]["status"] = "stopped"
-                cancelled_analyses.discard(analysis_id)  # Remove from cancelled set
-                return
-            
-            comment = comments_data[i]
-            
-            # Log progress every 10 comments or at milestones
-            current_comment_num = i + 1
-            if current_comment_num % 10 == 0 or current_comment_num in [1, 5, 25, 50, 100, 250, 500, 1000]:
-                elapsed_time = time.time() - start_time
-                comments_processed_in_session = current_comment_num - start_index
-                comments_per_second = comments_processed_in_session / elapsed_time if elapsed_time > 0 else 0
-                estimated_remaining = (total - current_comment_num) / comments_per_second if comments_per_second > 0 else 0
-                
-                log_analysis_step("📈 PROGRESS UPDATE", 
-                    f"Comment {current_comment_num}/{total} ({((current_comment_num)/total*100):.1f}%) | "
-                    f"Speed: {comments_per_second:.2f} comments/sec | "
-                    f"ETA: {estimated_remaining/60:.1f} minutes", 
-                    analysis_id=analysis_id)
-            
-            # Analyze comment with AI
-            analysis = await analyze_comment_with_ai(
-                comment["text_original"], 
-                comment["comment_id"], 
-                analysis_id
-            )
-            
-            # Add analysis to comment
-            comment["analysis"] = analysis
-            results.append(comment)
-            
+        run_db = open_run_db(analysis_id)
+
+        log_analysis_step("⚙️ ANALYSIS PARAMETERS", f"Total comments: {total}, Start index: {start_index}, Model: gpt-4o-mini, Concurrency: {ANALYSIS_CONCURRENCY}", analysis_id=analysis_id)
+
+        # The analyses are network-bound, so run them concurrently with a
+        # semaphore cap instead of one-at-a-time with a fixed sleep
+        semaphore = asyncio.Semaphore(ANALYSIS_CONCURRENCY)
+
+        async def analyze_batch_bounded(batch):
+            async with semaphore:
+                return batch, await analyze_comments_batch(batch, analysis_id)
+
+        # Each wave packs the chunk's unique texts into prompts of
+        # PROMPT_BATCH_SIZE comments and gathers them under the semaphore;
+        # results stay in order (resume depends on it). Cancellation is
+        # native: Task.cancel() raises CancelledError at the next await
+        wave_size = ANALYSIS_CONCURRENCY * PROMPT_BATCH_SIZE
+        committed = start_index  # Rows whose columns/DB entries are written
+        for chunk_start in range(start_index, total, wave_size):
+            chunk_end = min(chunk_start + wave_size, total)
+            chunk_texts = comments_df["text_original"].iloc[chunk_start:chunk_end].tolist()
+
+            # Deduplicate identical texts within the wave so concurrent
+            # duplicates don't race past the cache and double-pay the API
+            groups = {}
+            occurrences = {}
+            for text in chunk_texts:
+                key = analysis_cache_key(text)
+                groups.setdefault(key, text)
+                occurrences[key] = occurrences.get(key, 0) + 1
+
+            representatives = list(groups.values())
+            batches = pack_prompt_batches(representatives)
+
+            # Consume batches as they finish so progress ticks per batch
+            # rather than jumping once per wave
+            analyses_by_key = {}
+            wave_done = 0
+            for future in asyncio.as_completed([analyze_batch_bounded(b) for b in batches]):
+                batch, analyses = await future
+                for text, analysis in zip(batch, analyses):
+                    key = analysis_cache_key(text)
+                    analyses_by_key[key] = analysis
+                    wave_done += occurrences[key]
+
+                in_wave = chunk_start + wave_done
+                analysis_results[analysis_id].update({
+                    "progress": int(in_wave / total * 100),
+                    "processed_comments": in_wave
+                })
+
+            # Write the wave's results straight into the analysis columns by
+            # row position — no per-comment dict round-trip
+            chunk_analyses = [analyses_by_key[analysis_cache_key(text)] for text in chunk_texts]
+            for column in ANALYSIS_COLUMNS:
+                comments_df.iloc[
+                    chunk_start:chunk_end, comments_df.columns.get_loc(column)
+                ] = [analysis[column] for analysis in chunk_analyses]
+            persist_analysis_rows(run_db, chunk_start, chunk_analyses)
+            update_analysis_index(chunk_start, chunk_analyses)
+            update_running_stats(chunk_analyses)
+            data_version += 1
+            committed = chunk_end
+
             # Update progress
-            current_comment_num = i + 1
+            current_comment_num = chunk_end
             progress = int((current_comment_num) / total * 100)
             analysis_results[analysis_id].update({
                 "progress": progress,
-                "processed_comments": current_comment_num,
-                "results": results
+                "processed_comments": current_comment_num
             })
-            
-            # Small delay to prevent rate limiting
-            await asyncio.sleep(0.2)
-        
-        # Mark as completed only if not cancelled
-        if analysis_id not in cancelled_analyses:
-            total_time = time.time() - start_time
-            avg_time_per_comment = total_time / total
-            
-            log_analysis_step("🎉 ANALYSIS COMPLETED", 
-                f"Total time: {total_time/60:.2f} minutes | "
-                f"Average: {avg_time_per_comment:.2f}s per comment | "
-                f"Total comments analyzed: {total}", 
+
+            elapsed_time = time.time() - start_time
+            comments_processed_in_session = current_comment_num - start_index
+            comments_per_second = comments_processed_in_session / elapsed_time if elapsed_time > 0 else 0
+            estimated_remaining = (total - current_comment_num) / comments_per_second if comments_per_second > 0 else 0
+
+            log_analysis_step("📈 PROGRESS UPDATE",
+                f"Comment {current_comment_num}/{total} ({((current_comment_num)/total*100):.1f}%) | "
+                f"Speed: {comments_per_second:.2f} comments/sec | "
+                f"ETA: {estimated_remaining/60:.1f} minutes",
                 analysis_id=analysis_id)
-            
-            analysis_results[analysis_id]["status"] = "completed"
         
+        total_time = time.time() - start_time
+        avg_time_per_comment = total_time / total
+
+        log_analysis_step("🎉 ANALYSIS COMPLETED",
+            f"Total time: {total_time/60:.2f} minutes | "
+            f"Average: {avg_time_per_comment:.2f}s per comment | "
+            f"Total comments analyzed: {total}",
+            analysis_id=analysis_id)
+
+        # The filter buckets were updated incrementally per wave, so no
+        # full index rebuild is needed here
+        analysis_results[analysis_id]["status"] = "completed"
+
+    except asyncio.CancelledError:
+        # Roll the counters back to the last fully-written wave so resume
+        # restarts exactly where the columns and run DB left off
+        log_analysis_step("🛑 ANALYSIS CANCELLED", f"Stopped at comment {committed}/{len(comments_df)}", analysis_id=analysis_id)
+        analysis_results[analysis_id].update({
+            "status": "stopped",
+            "processed_comments": committed,
+            "progress": int(committed / len(comments_df) * 100) if len(comments_df) else 0
+        })
+        raise
     except Exception as e:
         log_analysis_step("💥 ANALYSIS FAILED", f"Error: {e}", analysis_id=analysis_id)
         analysis_results[analysis_id]["status"] = "failed"
         analysis_results[analysis_id]["error"] = str(e)
+    finally:
+        analysis_tasks.pop(analysis_id, None)
+        if run_db is not None:
+            run_db.close()
 
 @app.get("/api/analysis/status/{analysis_id}")
 async def get_analysis_status(analysis_id: str):
     """Get analysis status"""
-    log_analysis_step("📊 STATUS REQUEST", f"Analysis ID: {analysis_id}")
+    log_analysis_step("📊 STATUS REQUEST", f"Analysis ID: {analysis_id}", level=logging.DEBUG)
     
     if analysis_id not in analysis_results:
         log_analysis_step("❌ STATUS NOT FOUND", f"Analysis ID: {analysis_id}")
         raise HTTPException(status_code=404, detail="Analysis not found")
     
     status = analysis_results[analysis_id]
-    log_analysis_step("✅ STATUS RETURNED", f"Status: {status['status']}, Progress: {status['progress']}%, Processed: {status['processed_comments']}/{status['total_comments']}")
-    
+    log_analysis_step("✅ STATUS RETURNED", f"Status: {status['status']}, Progress: {status['progress']}%, Processed: {status['processed_comments']}/{status['total_comments']}", level=logging.DEBUG)
+
+    # Counters only; results are paged from the on-disk store via
+    # /api/analysis/results/{analysis_id} instead of re-serializing
+    # every processed comment on each poll
     return status
 
+@app.get("/api/analysis/results/{analysis_id}")
+async def get_analysis_results(analysis_id: str, offset: int = 0, limit: int = 100):
+    """Page analyzed comments for one run from its SQLite result store"""
+    db_path = os.path.join(RUNS_DIR, f"{analysis_id}.db")
+    if not os.path.exists(db_path):
+        raise HTTPException(status_code=404, detail="Analysis results not found")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        rows = conn.execute(
+            "SELECT row_idx, sentiment, category, quality_score, is_spam, confidence, processing_time "
+            "FROM results ORDER BY row_idx LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    # Join the persisted analyses back onto the columnar comment store,
+    # skipping rows from a previous upload that no longer exist in memory
+    rows = [row for row in rows if row[0] < len(comments_df)]
+    indices = [row[0] for row in rows]
+    records = comment_records(comments_df.iloc[indices]) if indices else []
+    for record, row in zip(records, rows):
+        record["analysis"] = {
+            "sentiment": row[1],
+            "category": row[2],
+            "quality_score": row[3],
+            "is_spam": bool(row[4]),
+            "confidence": row[5],
+            "processing_time": row[6],
+        }
+
+    return {
+        "analysis_id": analysis_id,
+        "total_results": total,
+        "offset": offset,
+        "limit": limit,
+        "results": records,
+    }
+
 @app.post("/api/analysis/stop/{analysis_id}")
 async def stop_analysis(analysis_id: str):
     """Stop a running analysis"""
-    global cancelled_analyses
-    
     if analysis_id not in analysis_results:
         raise HTTPException(status_code=404, detail="Analysis not found")
-    
+
     if analysis_results[analysis_id]["status"] != "processing":
         raise HTTPException(status_code=400, detail="Analysis is not currently running")
-    
-    # Mark analysis for cancellation and immediately update status
-    cancelled_analyses.add(analysis_id)
+
+    # Native cancellation: the CancelledError fires at the task's next
+    # await, aborting in-flight HTTP calls instead of waiting for a poll
+    task = analysis_tasks.get(analysis_id)
+    if task is not None:
+        task.cancel()
     analysis_results[analysis_id]["status"] = "stopping"
     log_analysis_step("🛑 STOP REQUESTED", f"Analysis ID: {analysis_id}", analysis_id=analysis_id)
-    
+
     return {"message": "Analysis stop requested", "analysis_id": analysis_id, "status": "stopping"}
 
 @app.get("/api/dashboard/stats")
 async def get_dashboard_stats():
     """Get dashboard statistics"""
-    if not comments_data:
+    # Serve the cached aggregation while the underlying data hasn't moved;
+    # interactive dashboards poll this far more often than the data changes
+    if _stats_cache["version"] == data_version and _stats_cache["payload"] is not None:
+        return _stats_cache["payload"]
+
+    if comments_df.empty:
         return {
             "total_comments": 0,
             "total_videos": 0,
@@ -466,62 +1098,43 @@ async def get_dashboard_stats():
             "quality_distribution": []
         }
     
-    # Calculate statistics
-    analyzed_comments = [c for c in comments_data if c.get("analysis")]
-    total_comments = len(comments_data)
-    total_videos = len(set(c["video_id"] for c in comments_data))
-    
-    if analyzed_comments:
-        # Sentiment ratios
-        sentiments = [c["analysis"]["sentiment"] for c in analyzed_comments]
-        positive_ratio = sentiments.count("positive") / len(sentiments)
-        negative_ratio = sentiments.count("negative") / len(sentiments)
-        neutral_ratio = sentiments.count("neutral") / len(sentiments)
-        
-        # Quality score
-        quality_scores = [c["analysis"]["quality_score"] for c in analyzed_comments]
-        avg_quality = sum(quality_scores) / len(quality_scores)
-        
-        # Spam ratio
-        spam_count = sum(1 for c in analyzed_comments if c["analysis"]["is_spam"])
-        spam_ratio = spam_count / len(analyzed_comments)
-        
-        # Categories
-        categories = [c["analysis"]["category"] for c in analyzed_comments]
-        category_counts = {}
-        for cat in categories:
-            category_counts[cat] = category_counts.get(cat, 0) + 1
-        top_categories = [{"category": k, "count": v} for k, v in sorted(category_counts.items(), key=lambda x: x[1], reverse=True)]
-        
-        # Quality distribution
-        quality_ranges = {"0-0.2": 0, "0.2-0.4": 0, "0.4-0.6": 0, "0.6-0.8": 0, "0.8-1.0": 0}
-        for score in quality_scores:
-            if score < 0.2:
-                quality_ranges["0-0.2"] += 1
-            elif score < 0.4:
-                quality_ranges["0.2-0.4"] += 1
-            elif score < 0.6:
-                quality_ranges["0.4-0.6"] += 1
-            elif score < 0.8:
-                quality_ranges["0.6-0.8"] += 1
-            else:
-                quality_ranges["0.8-1.0"] += 1
-        
-        quality_distribution = [{"range": k, "count": v} for k, v in quality_ranges.items()]
-        
+    # The analysis loop keeps these aggregates online, so the endpoint is
+    # O(1) regardless of corpus size; total_videos was computed at upload
+    total_comments = len(comments_df)
+    analyzed_count = running_stats["analyzed"]
+
+    if analyzed_count:
+        positive_ratio = running_stats["sentiment"]["positive"] / analyzed_count
+        negative_ratio = running_stats["sentiment"]["negative"] / analyzed_count
+        neutral_ratio = running_stats["sentiment"]["neutral"] / analyzed_count
+
+        avg_quality = running_stats["quality_sum"] / analyzed_count
+        spam_ratio = running_stats["spam"] / analyzed_count
+
+        # Categories, sorted by count descending
+        top_categories = [
+            {"category": category, "count": count}
+            for category, count in running_stats["category"].most_common()
+        ]
+
+        quality_distribution = [
+            {"range": label, "count": count}
+            for label, count in zip(QUALITY_BIN_LABELS, running_stats["quality_hist"])
+        ]
+
         # Timeline (simplified)
         comment_timeline = [{"date": "2024-01-15", "count": total_comments, "quality_avg": avg_quality}]
-        
+
     else:
         positive_ratio = negative_ratio = neutral_ratio = avg_quality = spam_ratio = 0
         top_categories = []
         quality_distribution = []
         comment_timeline = []
-    
-    return {
+
+    payload = {
         "total_comments": total_comments,
         "total_videos": total_videos,
-        "analyzed_comments": len(analyzed_comments),
+        "analyzed_comments": analyzed_count,
         "average_quality_score": avg_quality,
         "positive_sentiment_ratio": positive_ratio,
         "negative_sentiment_ratio": negative_ratio,
@@ -531,6 +1144,14 @@ async def get_dashboard_stats():
         "comment_timeline": comment_timeline,
         "quality_distribution": quality_distribution
     }
+    _stats_cache.update({"version": data_version, "payload": payload})
+    return payload
+
+# Resolved candidate rows per (data version, query, filters); interactive
+# dashboards re-issue the same query while paging, so repeats skip the
+# index walk and substring checks entirely
+_search_cache = OrderedDict()
+SEARCH_CACHE_MAX = 128
 
 @app.post("/api/comments/search")
 async def search_comments(request: dict):
@@ -540,45 +1161,108 @@ async def search_comments(request: dict):
         filters = request.get("filters", {})
         skip = request.get("skip", 0)
         limit = request.get("limit", 10)
-        
-        print(f"Search request: query='{query}', filters={filters}, skip={skip}, limit={limit}")
-        print(f"Total comments available: {len(comments_data)}")
-        
-        # Apply filters to comments
-        filtered_comments = []
-        
-        for comment in comments_data:
-            try:
-                # Text search filter
-                if query and query.lower() not in comment.get("text_original", "").lower():
-                    continue
-                    
-                # Sentiment filter - only apply if analysis exists
-                if filters.get("sentiment") and comment.get("analysis") and comment.get("analysis", {}).get("sentiment") != filters["sentiment"]:
-                    continue
-                    
-                # Category filter - only apply if analysis exists
-                if filters.get("category") and comment.get("analysis") and comment.get("analysis", {}).get("category") != filters["category"]:
-                    continue
-                    
-                # Spam filter - only apply if analysis exists
-                if filters.get("is_spam") != "" and comment.get("analysis"):
-                    is_spam = comment.get("analysis", {}).get("is_spam", False)
-                    filter_spam = filters["is_spam"] == "true"
-                    if is_spam != filter_spam:
-                        continue
-                
-                filtered_comments.append(comment)
-            except Exception as e:
-                print(f"Error processing comment: {e}")
-                continue
-        
-        # Apply pagination
-        total_filtered = len(filtered_comments)
-        paginated_comments = filtered_comments[skip:skip + limit]
-        
-        print(f"Filtered results: {total_filtered} total, returning {len(paginated_comments)} comments")
-        
+
+        log_analysis_step("🔍 SEARCH REQUEST",
+            f"query='{query}', filters={filters}, skip={skip}, limit={limit}, "
+            f"available={len(comments_df)}", level=logging.DEBUG)
+
+        cache_key = (
+            data_version,
+            query.lower().strip(),
+            filters.get("sentiment") or "",
+            filters.get("category") or "",
+            filters.get("is_spam") or "",
+        )
+        cached_positions = _search_cache.get(cache_key)
+        if cached_positions is not None:
+            _search_cache.move_to_end(cache_key)
+            subset = comments_df.iloc[cached_positions]
+            total_filtered = len(subset)
+            paginated_comments = comment_records(subset.iloc[skip:skip + limit])
+            return {
+                "comments": paginated_comments,
+                "total_count": total_filtered,
+                "page": (skip // limit) + 1,
+                "page_size": limit,
+                "total_pages": (total_filtered + limit - 1) // limit
+            }
+
+        # Narrow to candidate indices via the inverted indexes, then scan
+        # only those rows; unanalyzed comments pass the analysis filters
+        query_lower = query.lower()
+        candidates = None
+
+        if search_index["built"]:
+            if filters.get("sentiment"):
+                allowed = search_index["sentiment"].get(filters["sentiment"], set()) | search_index["unanalyzed"]
+                candidates = allowed if candidates is None else candidates & allowed
+
+            if filters.get("category"):
+                allowed = search_index["category"].get(filters["category"], set()) | search_index["unanalyzed"]
+                candidates = allowed if candidates is None else candidates & allowed
+
+            if filters.get("is_spam") in ("true", "false"):
+                spam_set = search_index["spam"] if filters["is_spam"] == "true" else search_index["not_spam"]
+                allowed = spam_set | search_index["unanalyzed"]
+                candidates = allowed if candidates is None else candidates & allowed
+
+            # Each query word must fall inside some token of a matching
+            # comment, so intersecting per-word posting unions gives the
+            # candidate set. A single word is thereby resolved exactly; a
+            # multi-word phrase still needs a substring check, but only on
+            # the (usually tiny) intersection instead of the whole corpus
+            if query_lower.split():
+                query_words = query_lower.split()
+                postings = None
+                for word in query_words:
+                    word_union = set()
+                    for token, indices in search_index["tokens"].items():
+                        if word in token:
+                            word_union |= indices
+                    postings = word_union if postings is None else postings & word_union
+                candidates = postings if candidates is None else candidates & postings
+                if len(query_words) == 1:
+                    query_lower = ""  # Already resolved via the token index
+
+        if candidates is not None:
+            subset = comments_df.iloc[sorted(candidates)]
+        else:
+            subset = comments_df
+
+        # Remaining filters run as boolean masks on the columnar subset;
+        # unanalyzed comments (sentiment NA) still pass the analysis filters
+        if query_lower:
+            subset = subset[subset["text_lower"].str.contains(query_lower, regex=False)]
+
+        if not search_index["built"]:
+            unanalyzed_mask = subset["sentiment"].isna()
+
+            if filters.get("sentiment"):
+                subset = subset[unanalyzed_mask | (subset["sentiment"] == filters["sentiment"])]
+                unanalyzed_mask = subset["sentiment"].isna()
+
+            if filters.get("category"):
+                subset = subset[unanalyzed_mask | (subset["category"] == filters["category"])]
+                unanalyzed_mask = subset["sentiment"].isna()
+
+            if filters.get("is_spam") in ("true", "false"):
+                filter_spam = filters["is_spam"] == "true"
+                subset = subset[unanalyzed_mask | (subset["is_spam"] == filter_spam)]
+
+        # Remember the resolved rows for repeat queries; keyed on the data
+        # version so uploads and analysis waves invalidate naturally
+        _search_cache[cache_key] = subset.index.tolist()
+        if len(_search_cache) > SEARCH_CACHE_MAX:
+            _search_cache.popitem(last=False)
+
+        # Apply pagination before serializing anything to Python dicts
+        total_filtered = len(subset)
+        paginated_comments = comment_records(subset.iloc[skip:skip + limit])
+
+        log_analysis_step("🔍 SEARCH RESULTS",
+            f"{total_filtered} total, returning {len(paginated_comments)} comments",
+            level=logging.DEBUG)
+
         return {
             "comments": paginated_comments,
             "total_count": total_filtered,
@@ -587,9 +1271,7 @@ async def search_comments(request: dict):
             "total_pages": (total_filtered + limit - 1) // limit
         }
     except Exception as e:
-        print(f"Error in search_comments: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in search_comments: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 if __name__ == "__main__":
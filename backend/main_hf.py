@@ -5,7 +5,9 @@ This version uses only Hugging Face models for analysis - no OpenAI API calls
 
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import pandas as pd
+import numpy as np
 import os
 import json
 import asyncio
@@ -14,14 +16,20 @@ from typing import List, Dict, Any
 import uuid
 import re
 import time
-from analysis_pipeline_optimized import analyze_comment_with_hf_optimized, analyze_batch_with_hf_optimized
+import logging
+from collections import OrderedDict
+from analysis_pipeline_optimized import analyze_comment_with_hf_optimized, analyze_batch_with_hf_optimized, get_optimized_pipeline
 from model_config import get_analysis_config, get_available_analysis_modes, AnalysisMode
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(message)s")
+logger = logging.getLogger(__name__)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="L'Oréal Comment Analysis API (Hugging Face)",
     description="AI-powered analysis using Hugging Face models only",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -36,42 +44,250 @@ app.add_middleware(
 # In-memory storage for demo
 comments_data = []
 analysis_results = {}
+
+# Columnar mirror of comments_data (struct-of-arrays): search and stats run
+# as vectorized pandas/NumPy operations instead of Python loops over dicts.
+# Initialized with its full schema so endpoints that filter on these columns
+# return empty results (not KeyError) before the first upload
+ANALYSIS_COLUMNS = ["sentiment", "category", "quality_score", "is_spam"]
+_comments_df = pd.DataFrame(columns=["text_original", "text_lower"] + ANALYSIS_COLUMNS)
+
+# Bumped on every rebuild of the comment store so cached aggregations can't
+# outlive a re-upload that happens to have the same row count
+_data_version = 0
+
+def _rebuild_comments_df() -> None:
+    """Rebuild the columnar mirror after an upload"""
+    global _comments_df, _data_version
+    _data_version += 1
+    texts = [c["text_original"] for c in comments_data]
+    _comments_df = pd.DataFrame({
+        "text_original": pd.Series(texts, dtype="object"),
+        # Lowercased once at upload; searches stop re-lowercasing the corpus
+        "text_lower": pd.Series([t.lower() for t in texts], dtype="object"),
+    })
+    for column in ANALYSIS_COLUMNS:
+        _comments_df[column] = pd.Series(pd.NA, index=_comments_df.index, dtype="object")
+
+def _write_analysis_columns(row_index: int, analysis: Dict[str, Any]) -> None:
+    """Mirror one comment's analysis into the columnar store"""
+    if row_index < len(_comments_df):
+        _comments_df.loc[row_index, ANALYSIS_COLUMNS] = [
+            analysis["sentiment"],
+            analysis["category"],
+            analysis["quality_score"],
+            analysis["is_spam"],
+        ]
 current_analysis_id = None
-cancelled_analyses = set()  # Track cancelled analyses
 
 # Analysis configuration
 current_analysis_mode = "balanced"  # Default mode
 analysis_config = get_analysis_config(current_analysis_mode)
 
-def log_analysis_step(step: str, details: str = "", comment_id: str = "", analysis_id: str = ""):
-    """Enhanced logging function for analysis steps"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-    prefix = f"[{timestamp}]"
-    
+# Single-consumer inference worker: FastAPI handles request concurrency, but
+# the HF pipelines see serial, batched input drained from one queue, so two
+# simultaneous analyses share one model and one forward pass per batch
+
+# Comment datasets are duplicate-heavy (emoji-only, "first!", copypasta);
+# cache results on normalized text so repeats never reach the model queue
+_result_cache = OrderedDict()
+RESULT_CACHE_MAX = 50_000
+_result_cache_hits = 0
+_result_cache_misses = 0
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def _result_cache_key(text: str) -> str:
+    return _WHITESPACE_RE.sub(' ', text.strip().lower())[:256]
+
+def _result_cache_lookup(key: str):
+    global _result_cache_hits, _result_cache_misses
+    cached = _result_cache.get(key)
+    if cached is not None:
+        _result_cache_hits += 1
+        _result_cache.move_to_end(key)
+        return cached
+    _result_cache_misses += 1
+    return None
+
+def _result_cache_store(key: str, result: Dict[str, Any]) -> None:
+    _result_cache[key] = result
+    if len(_result_cache) > RESULT_CACHE_MAX:
+        _result_cache.popitem(last=False)
+
+async def model_server_loop(queue: asyncio.Queue) -> None:
+    """Drain queued (text, comment_id, future) requests into batched inference"""
+    while True:
+        # Dynamic coalescing: take what is already waiting, then hold the
+        # partial batch open for batch_wait_ms to let stragglers join, and
+        # dispatch as soon as the batch fills or the deadline passes
+        batch = [await queue.get()]
+        max_batch = analysis_config.max_batch_size
+        deadline = time.monotonic() + analysis_config.batch_wait_ms / 1000.0
+        while len(batch) < max_batch:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            batch_results = await analyze_batch_with_hf_optimized(
+                [(text, comment_id) for text, comment_id, _ in batch]
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+
+        for (_, _, future), result in zip(batch, batch_results):
+            if not future.done():
+                future.set_result(result)
+
+# Trivial comments ("👍", "first", bare URLs) carry no signal a transformer
+# can improve on; compiled patterns classify them in microseconds instead of
+# spending a forward pass per occurrence
+EMOJI_ONLY_RE = re.compile(r'^[\W_]+$', re.UNICODE)
+URL_ONLY_RE = re.compile(r'^https?://\S+$')
+SPAM_HINT_RE = re.compile(r'(subscribe to my|check (?:out )?my channel|free \$)', re.IGNORECASE)
+
+def _fast_path_result(text: str):
+    """Return a canned result for trivial comments, or None for the model path"""
+    stripped = text.strip()
+    if len(stripped) < 3 or EMOJI_ONLY_RE.match(stripped):
+        return {
+            "sentiment": "neutral",
+            "category": "general",
+            "quality_score": 0.1,
+            "is_spam": False,
+            "confidence": {"sentiment": 0.9, "spam": 0.9, "category": 0.9, "quality": 0.9},
+            "processing_time": 0.0,
+            "model_source": "rule_fast_path"
+        }
+    if URL_ONLY_RE.match(stripped) or SPAM_HINT_RE.search(stripped):
+        return {
+            "sentiment": "neutral",
+            "category": "general",
+            "quality_score": 0.0,
+            "is_spam": True,
+            "confidence": {"sentiment": 0.9, "spam": 0.9, "category": 0.9, "quality": 0.9},
+            "processing_time": 0.0,
+            "model_source": "rule_fast_path"
+        }
+    return None
+
+async def submit_to_model(comment_text: str, comment_id: str = "") -> Dict[str, Any]:
+    """Enqueue one comment for the inference worker and await its result"""
+    fast = _fast_path_result(comment_text)
+    if fast is not None:
+        return fast
+
+    key = _result_cache_key(comment_text)
+    cached = _result_cache_lookup(key)
+    if cached is not None:
+        return cached
+
+    future = asyncio.get_running_loop().create_future()
+    await app.model_queue.put((comment_text, comment_id, future))
+    result = await future
+    _result_cache_store(key, result)
+    return result
+
+async def submit_batch_to_model(batch_data: List[tuple]) -> List[Dict[str, Any]]:
+    """Enqueue a batch of (text, comment_id) pairs and await all results"""
+    results: List[Any] = [None] * len(batch_data)
+    loop = asyncio.get_running_loop()
+    pending = {}  # cache_key -> (future, positions sharing that text)
+
+    for position, (comment_text, comment_id) in enumerate(batch_data):
+        fast = _fast_path_result(comment_text)
+        if fast is not None:
+            results[position] = fast
+            continue
+        key = _result_cache_key(comment_text)
+        cached = _result_cache_lookup(key)
+        if cached is not None:
+            results[position] = cached
+            continue
+        entry = pending.get(key)
+        if entry is not None:
+            # Duplicate within this batch: ride the representative's future
+            # instead of spending another model slot on the same text
+            entry[1].append(position)
+            continue
+        future = loop.create_future()
+        pending[key] = (future, [position])
+        await app.model_queue.put((comment_text, comment_id, future))
+
+    if pending:
+        resolved = await asyncio.gather(*(future for future, _ in pending.values()))
+        for (key, (_, positions)), result in zip(pending.items(), resolved):
+            for position in positions:
+                results[position] = result
+            _result_cache_store(key, result)
+
+    return results
+
+@app.on_event("startup")
+async def start_model_worker():
+    app.model_queue = asyncio.Queue()
+    app.model_worker = asyncio.create_task(model_server_loop(app.model_queue))
+    # Load and warm the models before traffic arrives; lazy init would make
+    # the first real request pay the multi-second load and compile cost
+    try:
+        await get_optimized_pipeline()
+    except Exception as e:
+        log_analysis_step("⚠️ MODEL PRELOAD FAILED", f"Will retry lazily on first request: {e}")
+
+def log_analysis_step(step: str, details: str = "", comment_id: str = "", analysis_id: str = "", level: int = logging.INFO):
+    """Enhanced logging function for analysis steps
+
+    Formatting only happens when the level is enabled, so per-comment DEBUG
+    lines cost a single check on the hot path; logging's asctime replaces the
+    per-call datetime.now().strftime.
+    """
+    if not logger.isEnabledFor(level):
+        return
+
+    prefix = ""
     if analysis_id:
-        prefix += f" [Analysis-{analysis_id[:8]}]"
+        prefix += f"[Analysis-{analysis_id[:8]}] "
     if comment_id:
-        prefix += f" [Comment-{comment_id[:8]}]"
-    
-    print(f"{prefix} {step}")
+        prefix += f"[Comment-{comment_id[:8]}] "
+
     if details:
-        print(f"{' ' * (len(prefix) + 1)} └─ {details}")
+        logger.log(level, "%s%s └─ %s", prefix, step, details)
+    else:
+        logger.log(level, "%s%s", prefix, step)
 
 async def analyze_comment_with_hf_only(comment_text: str, comment_id: str = "", analysis_id: str = "") -> Dict[str, Any]:
     """Analyze a single comment using ONLY Hugging Face models"""
-    log_analysis_step("🔍 STARTING HF ANALYSIS", f"Text: '{comment_text[:50]}{'...' if len(comment_text) > 50 else ''}'", comment_id, analysis_id)
-    log_analysis_step("🤖 USING HUGGING FACE ONLY", f"Mode: {current_analysis_mode}, Config: {analysis_config.mode.value}", comment_id, analysis_id)
-    
+    # Per-comment lines are DEBUG and guarded so the f-strings are only
+    # built when someone actually wants that much detail
+    if logger.isEnabledFor(logging.DEBUG):
+        log_analysis_step("🔍 STARTING HF ANALYSIS", f"Text: '{comment_text[:50]}{'...' if len(comment_text) > 50 else ''}'", comment_id, analysis_id, level=logging.DEBUG)
+        log_analysis_step("🤖 USING HUGGING FACE ONLY", f"Mode: {current_analysis_mode}, Config: {analysis_config.mode.value}", comment_id, analysis_id, level=logging.DEBUG)
+
+
     try:
         start_time = time.time()
         
-        # Use optimized Hugging Face pipeline
-        result = await analyze_comment_with_hf_optimized(comment_text, comment_id, analysis_id)
+        # Submit to the shared inference worker so concurrent requests batch
+        result = await submit_to_model(comment_text, comment_id)
         
         processing_time = time.time() - start_time
         
-        log_analysis_step("📥 RECEIVED HF RESPONSE", f"Processing time: {processing_time:.2f}s, Result: {result}", comment_id, analysis_id)
-        
+        if logger.isEnabledFor(logging.DEBUG):
+            log_analysis_step("📥 RECEIVED HF RESPONSE", f"Processing time: {processing_time:.2f}s, Result: {result}", comment_id, analysis_id, level=logging.DEBUG)
+
+
         # Format result to match expected structure
         analysis_result = {
             "sentiment": result.get("sentiment", "neutral"),
@@ -83,8 +299,10 @@ async def analyze_comment_with_hf_only(comment_text: str, comment_id: str = "",
             "model_source": "huggingface"  # Mark as HF source
         }
         
-        log_analysis_step("🎯 HF ANALYSIS COMPLETE", f"Sentiment: {analysis_result['sentiment']}, Category: {analysis_result['category']}, Quality: {analysis_result['quality_score']:.2f}, Spam: {analysis_result['is_spam']}", comment_id, analysis_id)
-        
+        if logger.isEnabledFor(logging.DEBUG):
+            log_analysis_step("🎯 HF ANALYSIS COMPLETE", f"Sentiment: {analysis_result['sentiment']}, Category: {analysis_result['category']}, Quality: {analysis_result['quality_score']:.2f}, Spam: {analysis_result['is_spam']}", comment_id, analysis_id, level=logging.DEBUG)
+
+
         return analysis_result
         
     except Exception as e:
@@ -105,38 +323,155 @@ async def analyze_comment_with_hf_only(comment_text: str, comment_id: str = "",
         
         return fallback_result
 
+# Expected CSV columns and their parse dtypes; likeCount is nullable int so
+# missing values survive parsing and can be filled vectorized afterwards
+CSV_DTYPES = {
+    'commentId': 'string',
+    'textOriginal': 'string',
+    'videoId': 'string',
+    'authorId': 'string',
+    'likeCount': 'Int64',
+    'publishedAt': 'string',
+}
+
 def process_csv_file(file_path: str) -> List[Dict[str, Any]]:
     """Process CSV file and return structured data"""
     log_analysis_step("📁 PROCESSING CSV FILE", f"File: {file_path}")
-    
+
     try:
-        df = pd.read_csv(file_path)
-        log_analysis_step("📊 CSV LOADED", f"Rows: {len(df)}, Columns: {list(df.columns)}")
-        
-        processed_comments = []
-        
-        for index, row in df.iterrows():
-            comment = {
-                "comment_id": str(row.get('commentId', f'comment_{index}')),
-                "text_original": str(row.get('textOriginal', '')),
-                "video_id": str(row.get('videoId', '')),
-                "author_id": str(row.get('authorId', '')),
-                "like_count": int(row.get('likeCount', 0)) if pd.notna(row.get('likeCount')) else 0,
-                "published_at": str(row.get('publishedAt', '')),
+        try:
+            # pyarrow parses the file multi-threaded in C++ and hands back
+            # columnar buffers; to_pylist() is a single C-level conversion
+            import pyarrow as pa
+            from pyarrow import csv as pacsv
+
+            table = pacsv.read_csv(
+                file_path,
+                read_options=pacsv.ReadOptions(use_threads=True, block_size=1 << 20),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=list(CSV_DTYPES),
+                    include_missing_columns=True,
+                    column_types={
+                        column: pa.int64() if column == 'likeCount' else pa.string()
+                        for column in CSV_DTYPES
+                    },
+                ),
+            )
+            log_analysis_step("📊 CSV LOADED", f"Rows: {table.num_rows}, Columns: {table.column_names}")
+
+            ids = table.column('commentId').fill_null('').to_pylist()
+            texts = table.column('textOriginal').fill_null('').to_pylist()
+            videos = table.column('videoId').fill_null('').to_pylist()
+            authors = table.column('authorId').fill_null('').to_pylist()
+            likes = table.column('likeCount').fill_null(0).to_pylist()
+            published = table.column('publishedAt').fill_null('').to_pylist()
+        except (ImportError, ValueError):
+            # Fall back to pandas when pyarrow is unavailable or the file
+            # defeats the typed parse; same column extraction either way
+            df = pd.read_csv(file_path, usecols=lambda c: c in CSV_DTYPES, dtype=CSV_DTYPES)
+            log_analysis_step("📊 CSV LOADED", f"Rows: {len(df)}, Columns: {list(df.columns)}")
+
+            # Tolerate missing columns the same way row.get() used to
+            for column, dtype in CSV_DTYPES.items():
+                if column not in df.columns:
+                    df[column] = pd.Series(dtype=dtype)
+
+            ids = df['commentId'].fillna('').astype(str).tolist()
+            texts = df['textOriginal'].fillna('').astype(str).tolist()
+            videos = df['videoId'].fillna('').astype(str).tolist()
+            authors = df['authorId'].fillna('').astype(str).tolist()
+            likes = df['likeCount'].fillna(0).astype('int64').tolist()
+            published = df['publishedAt'].fillna('').astype(str).tolist()
+
+        processed_comments = [
+            {
+                "comment_id": cid or f"comment_{i}",
+                "text_original": text,
+                "video_id": video,
+                "author_id": author,
+                "like_count": int(like),
+                "published_at": pub,
                 "analysis": None  # Will be filled during analysis
             }
-            processed_comments.append(comment)
-            
-            if (index + 1) % 100 == 0:  # Log every 100 comments
-                log_analysis_step("📝 PROCESSING PROGRESS", f"Processed {index + 1}/{len(df)} comments")
-        
+            for i, (cid, text, video, author, like, pub)
+            in enumerate(zip(ids, texts, videos, authors, likes, published))
+        ]
+
         log_analysis_step("✅ CSV PROCESSING COMPLETE", f"Total comments processed: {len(processed_comments)}")
         return processed_comments
-        
+
     except Exception as e:
         log_analysis_step("❌ CSV PROCESSING ERROR", f"Error: {e}")
         return []
 
+# Parsed uploads are mirrored to an Arrow IPC file so a restart reloads the
+# dataset memory-mapped (zero-copy columns) instead of needing a re-upload
+DATASET_PATH = "uploads/comments.arrow"
+
+def _persist_comments_arrow() -> None:
+    """Write the parsed comments to the Arrow dataset file"""
+    try:
+        import pyarrow as pa
+        from pyarrow import ipc
+    except ImportError:
+        return
+    if not comments_data:
+        return
+    try:
+        table = pa.table({
+            "comment_id": [c["comment_id"] for c in comments_data],
+            "text_original": [c["text_original"] for c in comments_data],
+            "video_id": [c["video_id"] for c in comments_data],
+            "author_id": [c["author_id"] for c in comments_data],
+            "like_count": pa.array([c["like_count"] for c in comments_data], type=pa.int64()),
+            "published_at": [c["published_at"] for c in comments_data],
+        })
+        with pa.OSFile(DATASET_PATH, "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    except Exception as e:
+        log_analysis_step("⚠️ ARROW PERSIST FAILED", f"Error: {e}")
+
+def _load_comments_arrow() -> bool:
+    """Restore comments_data from the Arrow dataset file, if present"""
+    global comments_data
+    try:
+        import pyarrow as pa
+        from pyarrow import ipc
+    except ImportError:
+        return False
+    if not os.path.exists(DATASET_PATH):
+        return False
+    try:
+        table = ipc.open_file(pa.memory_map(DATASET_PATH)).read_all()
+    except Exception as e:
+        log_analysis_step("⚠️ ARROW RESTORE FAILED", f"Error: {e}")
+        return False
+
+    columns = {name: table.column(name).to_pylist() for name in table.column_names}
+    comments_data = [
+        {
+            "comment_id": cid,
+            "text_original": text,
+            "video_id": video,
+            "author_id": author,
+            "like_count": like,
+            "published_at": pub,
+            "analysis": None
+        }
+        for cid, text, video, author, like, pub in zip(
+            columns["comment_id"], columns["text_original"], columns["video_id"],
+            columns["author_id"], columns["like_count"], columns["published_at"]
+        )
+    ]
+    _rebuild_comments_df()
+    return True
+
+@app.on_event("startup")
+async def restore_comments():
+    if await asyncio.to_thread(_load_comments_arrow):
+        log_analysis_step("📦 DATASET RESTORED", f"{len(comments_data)} comments from {DATASET_PATH}")
+
 # API Routes
 @app.get("/")
 async def root():
@@ -144,12 +479,14 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    cache_requests = _result_cache_hits + _result_cache_misses
     return {
-        "status": "healthy", 
-        "ai_enabled": True, 
+        "status": "healthy",
+        "ai_enabled": True,
         "analysis_mode": current_analysis_mode,
         "model_source": "huggingface",
-        "hf_available": True
+        "hf_available": True,
+        "result_cache_hit_ratio": _result_cache_hits / cache_requests if cache_requests else 0.0
     }
 
 @app.get("/api/analysis/modes")
@@ -194,14 +531,18 @@ async def upload_comments(file: UploadFile = File(...)):
         file_path = f"uploads/{file.filename}"
         os.makedirs("uploads", exist_ok=True)
         
+        # Stream to disk in 1MB chunks; reading the whole CSV first held
+        # the entire file in RAM on top of Starlette's spooled copy
         with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
+            while chunk := await file.read(1 << 20):
+                buffer.write(chunk)
+
         log_analysis_step("💾 FILE SAVED", f"Saved to: {file_path}")
-        
-        # Process CSV
-        comments_data = process_csv_file(file_path)
+
+        # Parse off the event loop so other requests keep being served
+        comments_data = await asyncio.to_thread(process_csv_file, file_path)
+        _rebuild_comments_df()
+        await asyncio.to_thread(_persist_comments_arrow)
         
         result = {
             "videos_processed": len(set(c["video_id"] for c in comments_data)),
@@ -234,8 +575,9 @@ async def start_analysis(request: dict):
         existing_analysis = analysis_results[resume_analysis_id]
         if existing_analysis["status"] == "stopped":
             log_analysis_step("🔄 RESUMING HF ANALYSIS", f"Resuming analysis ID: {resume_analysis_id}")
-            # Resume the existing analysis
+            # Resume the existing analysis with a fresh cancellation signal
             analysis_results[resume_analysis_id]["status"] = "processing"
+            analysis_results[resume_analysis_id]["cancel_event"] = asyncio.Event()
             current_analysis_id = resume_analysis_id
             
             # Start analysis from where it left off
@@ -256,7 +598,8 @@ async def start_analysis(request: dict):
         "total_comments": len(comments_data),
         "processed_comments": 0,
         "results": [],
-        "model_source": "huggingface"
+        "model_source": "huggingface",
+        "cancel_event": asyncio.Event()
     }
     
     # Start analysis in background
@@ -266,7 +609,7 @@ async def start_analysis(request: dict):
 
 async def run_hf_analysis(analysis_id: str, resume: bool = False):
     """Run Hugging Face analysis on comments with detailed logging"""
-    global analysis_results, comments_data, cancelled_analyses
+    global analysis_results, comments_data
     
     log_analysis_step("🔄 HF BACKGROUND ANALYSIS STARTED", f"Analysis ID: {analysis_id}, Resume: {resume}", analysis_id=analysis_id)
     
@@ -280,6 +623,7 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
             results = []
             start_index = 0
         
+        cancel_event = analysis_results[analysis_id]["cancel_event"]
         total = len(comments_data)
         start_time = time.time()
         
@@ -288,20 +632,23 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
         # Process comments in optimized batches for maximum speed
         batch_size = 32  # Process 32 comments at a time
         current_comment_num = start_index
+        next_log_at = start_index  # Log the first iteration, then every ~100 comments
         
         for i in range(start_index, total, batch_size):
-            # Check if analysis was cancelled
-            if analysis_id in cancelled_analyses:
+            # One coalesced cancellation check per batch; the stop endpoint
+            # sets the event and the next iteration observes it
+            if cancel_event.is_set():
                 log_analysis_step("🛑 HF ANALYSIS CANCELLED", f"Stopped at comment {current_comment_num+1}/{total}", analysis_id=analysis_id)
                 analysis_results[analysis_id]["status"] = "stopped"
-                cancelled_analyses.discard(analysis_id)  # Remove from cancelled set
                 return
-            
+
             batch_end = min(i + batch_size, total)
             batch_comments = comments_data[i:batch_end]
             
-            # Log progress every batch
-            if current_comment_num % 100 == 0 or current_comment_num in [1, 5, 25, 50, 100, 250, 500, 1000]:
+            # Single threshold comparison per iteration; the old predicate
+            # scanned a literal list and ran a modulo on every batch
+            if current_comment_num >= next_log_at:
+                next_log_at = (current_comment_num // 100 + 1) * 100
                 elapsed_time = time.time() - start_time
                 comments_processed_in_session = current_comment_num - start_index
                 comments_per_second = comments_processed_in_session / elapsed_time if elapsed_time > 0 else 0
@@ -313,13 +660,6 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
                     f"ETA: {estimated_remaining/60:.1f} minutes", 
                     analysis_id=analysis_id)
             
-            # Check cancellation again before processing batch
-            if analysis_id in cancelled_analyses:
-                log_analysis_step("🛑 HF ANALYSIS CANCELLED", f"Stopped at comment {current_comment_num+1}/{total}", analysis_id=analysis_id)
-                analysis_results[analysis_id]["status"] = "stopped"
-                cancelled_analyses.discard(analysis_id)  # Remove from cancelled set
-                return
-            
             # Prepare batch data for optimized processing
             batch_data = []
             for comment in batch_comments:
@@ -328,8 +668,8 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
             
             if batch_data:
                 try:
-                    # Analyze entire batch at once using optimized pipeline
-                    batch_results = await analyze_batch_with_hf_optimized(batch_data)
+                    # Submit the batch through the shared inference worker
+                    batch_results = await submit_batch_to_model(batch_data)
                     
                     # Update comments with analysis results
                     for j, (comment_text, comment_id) in enumerate(batch_data):
@@ -340,28 +680,15 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
                             comment_index = i + j
                             if comment_index < len(comments_data):
                                 comments_data[comment_index]["analysis"] = analysis_result
+                                _write_analysis_columns(comment_index, analysis_result)
                                 results.append(comments_data[comment_index])
                     
                     current_comment_num += len(batch_comments)
-                    
-                    # Check cancellation after batch processing
-                    if analysis_id in cancelled_analyses:
-                        log_analysis_step("🛑 HF ANALYSIS CANCELLED", f"Stopped at comment {current_comment_num+1}/{total}", analysis_id=analysis_id)
-                        analysis_results[analysis_id]["status"] = "stopped"
-                        cancelled_analyses.discard(analysis_id)  # Remove from cancelled set
-                        return
-                    
+
                 except Exception as e:
                     log_analysis_step("❌ BATCH ANALYSIS ERROR", f"Error analyzing batch {i+1}-{batch_end}: {str(e)}", analysis_id=analysis_id)
                     # Fallback to individual processing for this batch
-                    for comment in batch_comments:
-                        # Check cancellation before each individual comment
-                        if analysis_id in cancelled_analyses:
-                            log_analysis_step("🛑 HF ANALYSIS CANCELLED", f"Stopped at comment {current_comment_num+1}/{total}", analysis_id=analysis_id)
-                            analysis_results[analysis_id]["status"] = "stopped"
-                            cancelled_analyses.discard(analysis_id)  # Remove from cancelled set
-                            return
-                            
+                    for j, comment in enumerate(batch_comments):
                         try:
                             analysis = await analyze_comment_with_hf_optimized(
                                 comment["text_original"], 
@@ -369,6 +696,7 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
                                 analysis_id
                             )
                             comment["analysis"] = analysis
+                            _write_analysis_columns(i + j, analysis)
                             results.append(comment)
                             current_comment_num += 1
                         except Exception as individual_error:
@@ -384,12 +712,8 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
                 "processed_comments": current_comment_num,
                 "results": results
             })
-            
-            # Small delay between batches
-            await asyncio.sleep(0.05)  # Reduced delay for optimized processing
-        
         # Mark as completed only if not cancelled
-        if analysis_id not in cancelled_analyses:
+        if not cancel_event.is_set():
             total_time = time.time() - start_time
             avg_time_per_comment = total_time / total
             
@@ -400,7 +724,10 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
                 analysis_id=analysis_id)
             
             analysis_results[analysis_id]["status"] = "completed"
-        
+        else:
+            # Cancelled after the final batch had already been processed
+            analysis_results[analysis_id]["status"] = "stopped"
+
     except Exception as e:
         log_analysis_step("💥 HF ANALYSIS FAILED", f"Error: {e}", analysis_id=analysis_id)
         analysis_results[analysis_id]["status"] = "failed"
@@ -409,38 +736,69 @@ async def run_hf_analysis(analysis_id: str, resume: bool = False):
 @app.get("/api/analysis/status/{analysis_id}")
 async def get_analysis_status(analysis_id: str):
     """Get analysis status"""
-    log_analysis_step("📊 HF STATUS REQUEST", f"Analysis ID: {analysis_id}")
-    
+    log_analysis_step("📊 HF STATUS REQUEST", f"Analysis ID: {analysis_id}", level=logging.DEBUG)
+
     if analysis_id not in analysis_results:
         log_analysis_step("❌ HF STATUS NOT FOUND", f"Analysis ID: {analysis_id}")
         raise HTTPException(status_code=404, detail="Analysis not found")
     
     status = analysis_results[analysis_id]
-    log_analysis_step("✅ HF STATUS RETURNED", f"Status: {status['status']}, Progress: {status['progress']}%, Processed: {status['processed_comments']}/{status['total_comments']}")
-    
-    return status
+    if logger.isEnabledFor(logging.DEBUG):
+        log_analysis_step("✅ HF STATUS RETURNED", f"Status: {status['status']}, Progress: {status['progress']}%, Processed: {status['processed_comments']}/{status['total_comments']}", level=logging.DEBUG)
+
+    # Counters only — the full results list would make every poll a
+    # multi-megabyte JSON encode (and the cancel event isn't serializable);
+    # pages come from the results endpoint
+    return {key: value for key, value in status.items() if key not in ("results", "cancel_event")}
+
+@app.get("/api/analysis/results/{analysis_id}")
+async def get_analysis_results(analysis_id: str, offset: int = 0, limit: int = 100):
+    """Page through an analysis run's results"""
+    if analysis_id not in analysis_results:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    results = analysis_results[analysis_id].get("results", [])
+    return {
+        "analysis_id": analysis_id,
+        "total_results": len(results),
+        "offset": offset,
+        "limit": limit,
+        "results": results[offset:offset + limit],
+        "model_source": "huggingface"
+    }
 
 @app.post("/api/analysis/stop/{analysis_id}")
 async def stop_analysis(analysis_id: str):
     """Stop a running analysis"""
-    global cancelled_analyses
-    
     if analysis_id not in analysis_results:
         raise HTTPException(status_code=404, detail="Analysis not found")
-    
+
     if analysis_results[analysis_id]["status"] != "processing":
         raise HTTPException(status_code=400, detail="Analysis is not currently running")
-    
-    # Mark analysis for cancellation and immediately update status
-    cancelled_analyses.add(analysis_id)
+
+    # Signal the run loop and immediately update status
+    analysis_results[analysis_id]["cancel_event"].set()
     analysis_results[analysis_id]["status"] = "stopping"
     log_analysis_step("🛑 HF STOP REQUESTED", f"Analysis ID: {analysis_id}", analysis_id=analysis_id)
     
     return {"message": "Analysis stop requested", "analysis_id": analysis_id, "status": "stopping", "model_source": "huggingface"}
 
+# Last computed dashboard payload; dashboards poll far more often than the
+# underlying counters move, so identical polls are answered from here
+_stats_cache = {"key": None, "payload": None}
+
 @app.get("/api/dashboard/stats")
 async def get_dashboard_stats():
     """Get dashboard statistics"""
+    cache_key = (
+        _data_version,
+        len(comments_data),
+        current_analysis_id,
+        analysis_results.get(current_analysis_id, {}).get("processed_comments"),
+    )
+    if _stats_cache["key"] == cache_key and _stats_cache["payload"] is not None:
+        return _stats_cache["payload"]
+
     if not comments_data:
         return {
             "total_comments": 0,
@@ -457,62 +815,51 @@ async def get_dashboard_stats():
             "model_source": "huggingface"
         }
     
-    # Calculate statistics
-    analyzed_comments = [c for c in comments_data if c.get("analysis")]
+    # Calculate statistics from the columnar mirror — vectorized pandas
+    # reductions instead of list comprehensions over the dicts
     total_comments = len(comments_data)
     total_videos = len(set(c["video_id"] for c in comments_data))
-    
-    if analyzed_comments:
+    analyzed_mask = _comments_df["sentiment"].notna()
+    analyzed_count = int(analyzed_mask.sum())
+
+    if analyzed_count:
         # Sentiment ratios
-        sentiments = [c["analysis"]["sentiment"] for c in analyzed_comments]
-        positive_ratio = sentiments.count("positive") / len(sentiments)
-        negative_ratio = sentiments.count("negative") / len(sentiments)
-        neutral_ratio = sentiments.count("neutral") / len(sentiments)
-        
+        sentiment_counts = _comments_df.loc[analyzed_mask, "sentiment"].value_counts()
+        positive_ratio = int(sentiment_counts.get("positive", 0)) / analyzed_count
+        negative_ratio = int(sentiment_counts.get("negative", 0)) / analyzed_count
+        neutral_ratio = int(sentiment_counts.get("neutral", 0)) / analyzed_count
+
         # Quality score
-        quality_scores = [c["analysis"]["quality_score"] for c in analyzed_comments]
-        avg_quality = sum(quality_scores) / len(quality_scores)
-        
+        quality_scores = _comments_df.loc[analyzed_mask, "quality_score"].astype(float).to_numpy()
+        avg_quality = float(quality_scores.mean())
+
         # Spam ratio
-        spam_count = sum(1 for c in analyzed_comments if c["analysis"]["is_spam"])
-        spam_ratio = spam_count / len(analyzed_comments)
-        
+        spam_ratio = int(_comments_df.loc[analyzed_mask, "is_spam"].astype(bool).sum()) / analyzed_count
+
         # Categories
-        categories = [c["analysis"]["category"] for c in analyzed_comments]
-        category_counts = {}
-        for cat in categories:
-            category_counts[cat] = category_counts.get(cat, 0) + 1
-        top_categories = [{"category": k, "count": v} for k, v in sorted(category_counts.items(), key=lambda x: x[1], reverse=True)]
-        
-        # Quality distribution
-        quality_ranges = {"0-0.2": 0, "0.2-0.4": 0, "0.4-0.6": 0, "0.6-0.8": 0, "0.8-1.0": 0}
-        for score in quality_scores:
-            if score < 0.2:
-                quality_ranges["0-0.2"] += 1
-            elif score < 0.4:
-                quality_ranges["0.2-0.4"] += 1
-            elif score < 0.6:
-                quality_ranges["0.4-0.6"] += 1
-            elif score < 0.8:
-                quality_ranges["0.6-0.8"] += 1
-            else:
-                quality_ranges["0.8-1.0"] += 1
-        
-        quality_distribution = [{"range": k, "count": v} for k, v in quality_ranges.items()]
-        
+        category_counts = _comments_df.loc[analyzed_mask, "category"].value_counts()
+        top_categories = [{"category": k, "count": int(v)} for k, v in category_counts.items()]
+
+        # Quality distribution: same buckets as before (0.2 lands in 0.2-0.4)
+        bins = np.bincount(np.minimum((quality_scores * 5).astype(int), 4), minlength=5)
+        quality_labels = ["0-0.2", "0.2-0.4", "0.4-0.6", "0.6-0.8", "0.8-1.0"]
+        quality_distribution = [
+            {"range": label, "count": int(count)} for label, count in zip(quality_labels, bins)
+        ]
+
         # Timeline (simplified)
         comment_timeline = [{"date": "2024-01-15", "count": total_comments, "quality_avg": avg_quality}]
-        
+
     else:
         positive_ratio = negative_ratio = neutral_ratio = avg_quality = spam_ratio = 0
         top_categories = []
         quality_distribution = []
         comment_timeline = []
     
-    return {
+    payload = {
         "total_comments": total_comments,
         "total_videos": total_videos,
-        "analyzed_comments": len(analyzed_comments),
+        "analyzed_comments": analyzed_count,
         "average_quality_score": avg_quality,
         "positive_sentiment_ratio": positive_ratio,
         "negative_sentiment_ratio": negative_ratio,
@@ -523,6 +870,9 @@ async def get_dashboard_stats():
         "quality_distribution": quality_distribution,
         "model_source": "huggingface"
     }
+    _stats_cache["key"] = cache_key
+    _stats_cache["payload"] = payload
+    return payload
 
 @app.post("/api/comments/search")
 async def search_comments(request: dict):
@@ -533,44 +883,39 @@ async def search_comments(request: dict):
         skip = request.get("skip", 0)
         limit = request.get("limit", 10)
         
-        print(f"Search request: query='{query}', filters={filters}, skip={skip}, limit={limit}")
-        print(f"Total comments available: {len(comments_data)}")
-        
-        # Apply filters to comments
-        filtered_comments = []
-        
-        for comment in comments_data:
-            try:
-                # Text search filter
-                if query and query.lower() not in comment.get("text_original", "").lower():
-                    continue
-                    
-                # Sentiment filter - only apply if analysis exists
-                if filters.get("sentiment") and comment.get("analysis") and comment.get("analysis", {}).get("sentiment") != filters["sentiment"]:
-                    continue
-                    
-                # Category filter - only apply if analysis exists
-                if filters.get("category") and comment.get("analysis") and comment.get("analysis", {}).get("category") != filters["category"]:
-                    continue
-                    
-                # Spam filter - only apply if analysis exists
-                if filters.get("is_spam") != "" and comment.get("analysis"):
-                    is_spam = comment.get("analysis", {}).get("is_spam", False)
-                    filter_spam = filters["is_spam"] == "true"
-                    if is_spam != filter_spam:
-                        continue
-                
-                filtered_comments.append(comment)
-            except Exception as e:
-                print(f"Error processing comment: {e}")
-                continue
-        
-        # Apply pagination
-        total_filtered = len(filtered_comments)
-        paginated_comments = filtered_comments[skip:skip + limit]
-        
-        print(f"Filtered results: {total_filtered} total, returning {len(paginated_comments)} comments")
+        log_analysis_step("🔍 SEARCH REQUEST",
+            f"query='{query}', filters={filters}, skip={skip}, limit={limit}, "
+            f"available={len(comments_data)}", level=logging.DEBUG)
+
+        # Filters run as boolean masks over the columnar mirror; unanalyzed
+        # comments (sentiment NA) still pass the analysis filters
+        mask = pd.Series(True, index=_comments_df.index)
+
+        if query:
+            mask &= _comments_df["text_lower"].str.contains(query.lower(), regex=False, na=False)
+
+        unanalyzed = _comments_df["sentiment"].isna()
+
+        if filters.get("sentiment"):
+            mask &= unanalyzed | (_comments_df["sentiment"] == filters["sentiment"])
+
+        if filters.get("category"):
+            mask &= unanalyzed | (_comments_df["category"] == filters["category"])
+
+        if filters.get("is_spam") in ("true", "false"):
+            filter_spam = filters["is_spam"] == "true"
+            mask &= unanalyzed | (_comments_df["is_spam"] == filter_spam)
+
+        matched_indices = _comments_df.index[mask]
+
+        # Apply pagination, then pull only the page's dicts from comments_data
+        total_filtered = len(matched_indices)
+        paginated_comments = [comments_data[i] for i in matched_indices[skip:skip + limit]]
         
+        log_analysis_step("🔍 SEARCH RESULTS",
+            f"{total_filtered} total, returning {len(paginated_comments)} comments",
+            level=logging.DEBUG)
+
         return {
             "comments": paginated_comments,
             "total_count": total_filtered,
@@ -580,9 +925,7 @@ async def search_comments(request: dict):
             "model_source": "huggingface"
         }
     except Exception as e:
-        print(f"Error in search_comments: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Error in search_comments: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ Model Configuration for Hugging Face Pipeline
 This module provides configuration options for different models and analysis strategies.
 """
 
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
@@ -14,7 +15,7 @@ class AnalysisMode(Enum):
     ACCURATE = "accurate"   # Most accurate, slower
     CUSTOM = "custom"       # Custom configuration
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ModelConfig:
     """Configuration for a specific model"""
     name: str
@@ -26,7 +27,7 @@ class ModelConfig:
     confidence_threshold: float = 0.5
     fallback_enabled: bool = True
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PipelineConfig:
     """Configuration for the entire analysis pipeline"""
     mode: AnalysisMode
@@ -36,6 +37,20 @@ class PipelineConfig:
     max_workers: int = 4
     timeout_seconds: int = 30
     fallback_to_rules: bool = True
+    # Inference-worker coalescing: largest micro-batch to assemble and how
+    # long to wait for stragglers before dispatching a partial batch
+    max_batch_size: int = 64
+    batch_wait_ms: int = 5
+    # Weight precision: "int8" (dynamic quantization on CPU), "bf16"/"auto"
+    # (reduced dtype where the device supports it), or "fp32" (no reduction)
+    precision: str = "auto"
+    # Sort submissions by text length before slicing into batches so each
+    # batch pads to its own longest member rather than the global maximum
+    sort_by_length: bool = True
+    # Attention kernel for model loads: "sdpa" fuses attention through
+    # PyTorch SDPA (FlashAttention where supported), "eager" is the vanilla
+    # O(L^2) implementation
+    attn_implementation: str = "sdpa"
 
 class ModelConfigManager:
     """Manages model configurations for different analysis modes"""
@@ -78,7 +93,8 @@ class ModelConfigManager:
                 parallel_processing=True,
                 batch_size=16,
                 max_workers=2,
-                timeout_seconds=10
+                timeout_seconds=10,
+                precision="int8"
             ),
             
             AnalysisMode.BALANCED: PipelineConfig(
@@ -116,7 +132,8 @@ class ModelConfigManager:
                 parallel_processing=True,
                 batch_size=8,
                 max_workers=4,
-                timeout_seconds=20
+                timeout_seconds=20,
+                precision="bf16"
             ),
             
             AnalysisMode.ACCURATE: PipelineConfig(
@@ -158,7 +175,8 @@ class ModelConfigManager:
                 parallel_processing=True,
                 batch_size=4,
                 max_workers=2,
-                timeout_seconds=60
+                timeout_seconds=60,
+                precision="fp32"
             )
         }
     
@@ -214,8 +232,13 @@ class ModelConfigManager:
 # Global configuration manager
 config_manager = ModelConfigManager()
 
+@lru_cache(maxsize=8)
 def get_analysis_config(mode: str = "balanced") -> PipelineConfig:
-    """Get analysis configuration by mode name"""
+    """Get analysis configuration by mode name
+
+    Cached: callers hit this per request, and the presets are immutable, so
+    repeats skip the enum construction and lowercasing entirely.
+    """
     try:
         analysis_mode = AnalysisMode(mode.lower())
         return config_manager.get_config(analysis_mode)
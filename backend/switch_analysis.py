@@ -3,36 +3,117 @@ Analysis Backend Switcher
 Easy way to switch between OpenAI and Hugging Face backends
 """
 
+import signal
 import subprocess
 import sys
 import os
 import time
 
-def kill_existing_backends():
-    """Kill any existing Python processes running backends"""
+# Backends are tracked by PID so stopping them only touches processes this
+# switcher started — never every python.exe on the machine
+PID_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pids")
+_running = {}  # name -> subprocess.Popen started in this session
+
+def _pid_file(name):
+    return os.path.join(PID_DIR, f"{name}.pid")
+
+def _write_pid(name, pid):
+    os.makedirs(PID_DIR, exist_ok=True)
+    with open(_pid_file(name), "w") as f:
+        f.write(str(pid))
+
+def _read_pid(name):
     try:
-        # Kill Python processes (be careful with this)
-        subprocess.run(["taskkill", "/f", "/im", "python.exe"], capture_output=True)
-        print("🔄 Killed existing backend processes")
-        time.sleep(2)
-    except Exception as e:
-        print(f"⚠️ Could not kill processes: {e}")
+        with open(_pid_file(name)) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def _stop_pid(pid):
+    """Stop a backend from a previous session: SIGTERM, poll, then SIGKILL"""
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        return  # Already gone (or never ours); nothing to do
+
+    if os.name == "nt":
+        return  # os.kill on Windows is TerminateProcess — already final
+
+    delay, waited = 0.01, 0.0
+    while waited < 1.0:
+        time.sleep(delay)
+        waited += delay
+        delay = min(delay * 2, 0.2)
+        try:
+            os.kill(pid, 0)  # Liveness probe only
+        except OSError:
+            return
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+def kill_existing_backends():
+    """Stop backend processes this switcher is tracking"""
+    stopped = False
+    for name in ("openai", "hf"):
+        proc = _running.pop(name, None)
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            stopped = True
+
+        pid = _read_pid(name)
+        if pid is not None:
+            if proc is None or proc.pid != pid:
+                _stop_pid(pid)
+                stopped = True
+            try:
+                os.remove(_pid_file(name))
+            except OSError:
+                pass
+
+    if stopped:
+        print("🔄 Stopped existing backend processes")
+
+def _launch_backend(name, script):
+    # Child output goes to its own log file instead of interleaving with the
+    # menu; -u keeps the log live without line-buffer stalls. A fresh process
+    # group (Windows) and close_fds keep the child from inheriting handles
+    # that would pin the parent's console or sockets.
+    os.makedirs("logs", exist_ok=True)
+    log_path = os.path.join("logs", f"{name}.out")
+    with open(log_path, "ab") as log_file:
+        proc = subprocess.Popen(
+            [sys.executable, "-u", script],
+            cwd=os.getcwd(),
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            close_fds=True,
+            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0,
+        )
+    _running[name] = proc
+    _write_pid(name, proc.pid)
+    print(f"📜 Logs: {log_path}")
+    return proc
 
 def start_openai_backend():
     """Start the OpenAI backend"""
     print("🤖 Starting OpenAI Backend...")
     kill_existing_backends()
-    
+
     try:
         # Start OpenAI backend
-        subprocess.Popen([
-            sys.executable, "main.py"
-        ], cwd=os.getcwd())
+        _launch_backend("openai", "main.py")
         print("✅ OpenAI Backend started on http://localhost:8000")
         print("📊 Features: Full AI analysis with OpenAI models")
         print("💰 Cost: Higher (uses OpenAI API)")
         print("⚡ Speed: Medium")
-        
+
     except Exception as e:
         print(f"❌ Failed to start OpenAI backend: {e}")
 
@@ -40,17 +121,15 @@ def start_hf_backend():
     """Start the Hugging Face backend"""
     print("🤗 Starting Hugging Face Backend...")
     kill_existing_backends()
-    
+
     try:
         # Start HF backend
-        subprocess.Popen([
-            sys.executable, "main_hf.py"
-        ], cwd=os.getcwd())
+        _launch_backend("hf", "main_hf.py")
         print("✅ Hugging Face Backend started on http://localhost:8001")
         print("📊 Features: Fast analysis with HF models + rule-based")
         print("💰 Cost: Free (local models)")
         print("⚡ Speed: Fast")
-        
+
     except Exception as e:
         print(f"❌ Failed to start HF backend: {e}")
 
@@ -58,28 +137,38 @@ def start_hf_backend():
 def show_status():
     """Show current backend status"""
     print("\n🔍 Checking backend status...")
-    
+
     backends = [
         ("OpenAI", "http://localhost:8000", "main.py"),
         ("Hugging Face", "http://localhost:8001", "main_hf.py")
     ]
-    
-    for name, url, file in backends:
-        try:
-            import requests
-            response = requests.get(f"{url}/health", timeout=2)
-            if response.status_code == 200:
-                data = response.json()
-                print(f"✅ {name} Backend: RUNNING on {url}")
-                print(f"   Model: {data.get('model_source', 'Unknown')}")
-                print(f"   AI Enabled: {data.get('ai_enabled', False)}")
-            else:
-                print(f"❌ {name} Backend: NOT RUNNING on {url}")
-        except:
-            print(f"❌ {name} Backend: NOT RUNNING on {url}")
+
+    import asyncio
+    import httpx
+
+    # Probe both backends concurrently so a dead one costs its own timeout
+    # once instead of serializing 2s per backend
+    async def check_backends():
+        async with httpx.AsyncClient(timeout=2) as client:
+            async def probe(name, url, file):
+                try:
+                    response = await client.get(f"{url}/health")
+                    if response.status_code == 200:
+                        data = response.json()
+                        return (f"✅ {name} Backend: RUNNING on {url}\n"
+                                f"   Model: {data.get('model_source', 'Unknown')}\n"
+                                f"   AI Enabled: {data.get('ai_enabled', False)}")
+                except Exception:
+                    pass
+                return f"❌ {name} Backend: NOT RUNNING on {url}"
+
+            return await asyncio.gather(*(probe(*backend) for backend in backends))
+
+    for line in asyncio.run(check_backends()):
+        print(line)
 
 def main():
-    """Main menu"""
+    """Interactive menu"""
     while True:
         print("\n" + "="*50)
         print("🔄 ANALYSIS BACKEND SWITCHER")
@@ -110,5 +199,30 @@ def main():
         
         input("\nPress Enter to continue...")
 
+def cli():
+    """One-shot subcommands for scripts and CI; no args opens the menu"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analysis backend switcher")
+    sub = parser.add_subparsers(dest="cmd")
+    start = sub.add_parser("start", help="Start a backend (stops any running one first)")
+    start.add_argument("backend", choices=["openai", "hf"])
+    sub.add_parser("status", help="Check backend health")
+    sub.add_parser("stop", help="Stop tracked backends")
+
+    args = parser.parse_args()
+    if args.cmd == "start":
+        if args.backend == "openai":
+            start_openai_backend()
+        else:
+            start_hf_backend()
+    elif args.cmd == "status":
+        show_status()
+    elif args.cmd == "stop":
+        kill_existing_backends()
+        print("🛑 All backends stopped")
+    else:
+        main()
+
 if __name__ == "__main__":
-    main()
+    cli()